@@ -7,23 +7,348 @@
 # Author:       Skultety
 #
 # Created:      07/27/2018
-# Updated:
+# Updated:      10/18/2026
 #
-# Upgrades:
+# Upgrades:     Version 1.1 (10/18/2026) Attachments are streamed straight from the
+#               cursor to a pool of writer threads instead of being copied and
+#               written one at a time. The queue between the cursor and the writers
+#               is bounded so memory use stays flat for large attachment tables.
+#               Throughput is reported when the export finishes.
+#               Version 1.2 (10/18/2026) Writes a manifest to the output folder
+#               recording the size and MD5 hash of every exported attachment by
+#               ATTACHMENTID. Reruns skip attachments that are unchanged and an
+#               interrupted export resumes where it stopped. Attachments that share
+#               an ATT_NAME are written with the ATTACHMENTID appended to the name
+#               instead of overwriting each other.
+#               Version 1.3 (10/18/2026) Optional parent feature class and where
+#               clause to export only the attachments of selected features, for
+#               example one PID. Attachments are written to a subfolder for each
+#               parent feature named from a field the user selects.
+#               Version 1.4 (10/18/2026) Optional deduplicated output. Each distinct
+#               attachment is written once to a _store folder named by its MD5 hash
+#               and every attachment is linked to it, or listed in attachment_index.csv
+#               where links are not available. Photos attached to several features are
+#               only written and stored once. Every run rewrites the index for the
+#               attachments still linked to the store, and an export that is not
+#               deduplicated removes the store files no attachment uses any more.
 #-------------------------------------------------------------------------------------
 
 import arcpy
 from arcpy import da
+import csv
+import hashlib
+import json
 import os
+import re
+import threading
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 inTable = arcpy.GetParameterAsText(0)
 fileLocation = arcpy.GetParameterAsText(1)
+# Optional number of writer threads, defaults to 4
+writerCount = arcpy.GetParameterAsText(2)
+if writerCount:
+    writerCount = max(1, int(writerCount))
+else:
+    writerCount = 4
+# Optional parent feature class, where clause and field used to name subfolders
+parentTable = arcpy.GetParameterAsText(3)
+parentWhere = arcpy.GetParameterAsText(4)
+folderField = arcpy.GetParameterAsText(5)
+if not folderField:
+    folderField = "PID"
+# Optional, store each distinct attachment once and link the attachments to it
+deduplicate = arcpy.GetParameterAsText(6).lower() == "true"
+# Hard links are not available on Windows in Python 2
+canLink = hasattr(os, "link")
 
-with da.SearchCursor(inTable, ['DATA', 'ATT_NAME', 'ATTACHMENTID']) as cursor:
-    for item in cursor:
-        attachment = item[0]
-        filename = str(item[1])
-        open(fileLocation + os.sep + filename, 'wb').write(attachment.tobytes())
-        del item
-        del filename
+# Build an index of the selected parent features, GlobalID -> subfolder name.
+# The attachment cursor is then limited to these features with a where clause
+# on REL_GLOBALID so the rest of the attachment table is never read.
+parentIndex = {}
+if parentTable:
+    globalIdField = arcpy.Describe(parentTable).globalIDFieldName
+    with da.SearchCursor(parentTable, [globalIdField, folderField], parentWhere or None) as cursor:
+        for row in cursor:
+            if row[1] is None or str(row[1]).strip() == "":
+                folderName = "No_" + folderField
+            else:
+                folderName = re.sub(r'[\\/:*?"<>|]', "_", str(row[1]).strip())
+            parentIndex[row[0]] = folderName
+    arcpy.AddMessage("{0} parent features selected".format(len(parentIndex)))
+
+# Where clauses for the attachment cursor, the GlobalIDs are split into groups
+# to stay under the database limit on the length of an IN list
+if parentTable:
+    globalIds = sorted(parentIndex)
+    attachmentWheres = []
+    for i in range(0, len(globalIds), 500):
+        idList = ", ".join("'{0}'".format(globalId) for globalId in globalIds[i:i + 500])
+        attachmentWheres.append("REL_GLOBALID IN ({0})".format(idList))
+    if not attachmentWheres:
+        arcpy.AddWarning("No parent features matched, no attachments exported")
+else:
+    attachmentWheres = [None]
+
+# Attachments waiting to be written. The cursor blocks once the queue is full,
+# so no more than a few blobs per writer are held in memory at any time.
+writeQueue = queue.Queue(maxsize=writerCount * 2)
+statsLock = threading.Lock()
+stats = {"files": 0, "bytes": 0, "stored": 0, "storedBytes": 0}
+writeErrors = []
+
+# Read the manifest left by previous runs. Each line is one exported attachment,
+# a later line for the same ATTACHMENTID replaces an earlier one.
+manifestPath = os.path.join(fileLocation, "attachment_manifest.json")
+manifest = {}
+if os.path.isfile(manifestPath):
+    with open(manifestPath, 'r') as manifestFile:
+        for line in manifestFile:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Partial last line from an interrupted run
+                continue
+            manifest[record["ATTACHMENTID"]] = record
+
+# Output file names already taken, used to keep duplicate ATT_NAME values apart
+# Records that share a file with another attachment are dropped, the file holds only
+# one of them, so those attachments are exported again under names of their own
+claimedNames = {}
+sharedNames = set()
+for record in manifest.values():
+    if record["file"].lower() in claimedNames:
+        sharedNames.add(record["file"].lower())
+    claimedNames[record["file"].lower()] = record["ATTACHMENTID"]
+for attachmentId in list(manifest):
+    if manifest[attachmentId]["file"].lower() in sharedNames:
+        del manifest[attachmentId]
+for fileName in sharedNames:
+    del claimedNames[fileName]
+
+# Define function to pick the output file name for an attachment, relative to
+# the output folder. An attachment keeps its earlier name unless it now belongs in
+# a different subfolder.
+createdFolders = set()
+def OutputName(attachmentId, attName, folderName):
+    record = manifest.get(attachmentId)
+    if record is not None and os.path.dirname(record["file"]) == folderName \
+            and claimedNames.get(record["file"].lower()) == attachmentId:
+        return record["file"]
+    if folderName and folderName not in createdFolders:
+        if not os.path.isdir(os.path.join(fileLocation, folderName)):
+            os.mkdir(os.path.join(fileLocation, folderName))
+        createdFolders.add(folderName)
+    # The ATTACHMENTID is appended when the name is taken, then a counter until the
+    # name is not taken by another attachment
+    root, ext = os.path.splitext(attName)
+    fileName = os.path.join(folderName, attName)
+    count = 1
+    while claimedNames.get(fileName.lower(), attachmentId) != attachmentId:
+        if count == 1:
+            fileName = os.path.join(folderName, "{0}_{1}{2}".format(root, attachmentId, ext))
+        else:
+            fileName = os.path.join(folderName, "{0}_{1}_{2}{3}".format(root, attachmentId, count, ext))
+        count += 1
+    claimedNames[fileName.lower()] = attachmentId
+    return fileName
+
+# Define function to check if an attachment was already exported unchanged to
+# the subfolder it belongs in
+def IsUnchanged(attachmentId, attachment, folderName):
+    record = manifest.get(attachmentId)
+    if record is None or record["size"] != len(attachment):
+        return False
+    if os.path.dirname(record["file"]) != folderName:
+        # Exported to another folder layout
+        return False
+    if claimedNames.get(record["file"].lower()) != attachmentId:
+        # The file belongs to another attachment
+        return False
+    if deduplicate != ("store" in record):
+        # Exported in the other output mode
+        return False
+    if deduplicate and not canLink:
+        outPath = os.path.join(fileLocation, record["store"])
+    else:
+        outPath = os.path.join(fileLocation, record["file"])
+    if not os.path.isfile(outPath) or os.path.getsize(outPath) != record["size"]:
+        return False
+    return hashlib.md5(attachment).hexdigest() == record["md5"]
+
+manifestLog = open(manifestPath, 'a')
+
+# Hashes whose store file is being written or done, other writers with the same
+# attachment wait for the event instead of writing it again
+storeEvents = {}
+
+# Define function to write an attachment to the store once, named by its hash
+# Returns the store path relative to the output folder
+def StoreAttachment(digest, attName, attachment):
+    storeName = os.path.join("_store", digest[:2], digest + os.path.splitext(attName)[1].lower())
+    storePath = os.path.join(fileLocation, storeName)
+    with statsLock:
+        event = storeEvents.get(storeName)
+        owner = event is None
+        if owner:
+            event = storeEvents[storeName] = threading.Event()
+    if not owner:
+        event.wait()
+        return storeName
+    try:
+        if not (os.path.isfile(storePath) and os.path.getsize(storePath) == len(attachment)):
+            if not os.path.isdir(os.path.dirname(storePath)):
+                try:
+                    os.makedirs(os.path.dirname(storePath))
+                except OSError:
+                    # Made by another writer
+                    pass
+            # Written under a temporary name so an interrupted write is never reused.
+            # Files are removed before writing and never opened in place, a write
+            # through a hard link would change every attachment linked to it.
+            if os.path.isfile(storePath + ".part"):
+                os.remove(storePath + ".part")
+            with open(storePath + ".part", 'wb') as outFile:
+                outFile.write(attachment)
+            if os.path.isfile(storePath):
+                os.remove(storePath)
+            os.rename(storePath + ".part", storePath)
+            with statsLock:
+                stats["stored"] += 1
+                stats["storedBytes"] += len(attachment)
+    finally:
+        event.set()
+    return storeName
+
+# Define function run by each writer thread
+def WriteAttachments():
+    while True:
+        job = writeQueue.get()
+        if job is None:
+            writeQueue.task_done()
+            break
+        attachmentId, attName, fileName, attachment = job
+        outPath = os.path.join(fileLocation, fileName)
+        try:
+            digest = hashlib.md5(attachment).hexdigest()
+            record = {"ATTACHMENTID": attachmentId, "ATT_NAME": attName, "file": fileName,
+                      "size": len(attachment), "md5": digest}
+            if deduplicate:
+                record["store"] = StoreAttachment(digest, attName, attachment)
+                if canLink:
+                    if os.path.isfile(outPath):
+                        os.remove(outPath)
+                    os.link(os.path.join(fileLocation, record["store"]), outPath)
+            else:
+                # A file left by a deduplicated export is a hard link to a store file,
+                # it is removed so the write does not change the store
+                if os.path.isfile(outPath):
+                    os.remove(outPath)
+                # Write the memoryview directly, no intermediate copy with tobytes()
+                with open(outPath, 'wb') as outFile:
+                    outFile.write(attachment)
+            with statsLock:
+                # Only completed files are logged, so a rerun resumes from here
+                manifestLog.write(json.dumps(record) + "\n")
+                manifestLog.flush()
+                manifest[attachmentId] = record
+                stats["files"] += 1
+                stats["bytes"] += len(attachment)
+        except (IOError, OSError) as err:
+            with statsLock:
+                writeErrors.append("{0}: {1}".format(outPath, err))
         del attachment
+        writeQueue.task_done()
+
+writers = []
+for i in range(writerCount):
+    writer = threading.Thread(target=WriteAttachments)
+    writer.daemon = True
+    writer.start()
+    writers.append(writer)
+
+startTime = time.time()
+skipped = 0
+try:
+    for attachmentWhere in attachmentWheres:
+        # Sorted so the lowest ATTACHMENTID keeps a duplicated ATT_NAME on every run
+        with da.SearchCursor(inTable, ['DATA', 'ATT_NAME', 'ATTACHMENTID', 'REL_GLOBALID'], attachmentWhere,
+                             sql_clause=(None, "ORDER BY ATTACHMENTID")) as cursor:
+            for item in cursor:
+                attachment = item[0]
+                filename = str(item[1])
+                attachmentId = item[2]
+                folderName = parentIndex.get(item[3], "")
+                if IsUnchanged(attachmentId, attachment, folderName):
+                    skipped += 1
+                else:
+                    outName = OutputName(attachmentId, filename, folderName)
+                    writeQueue.put((attachmentId, filename, outName, attachment))
+                del item
+                del filename
+                del attachment
+finally:
+    # Tell each writer to stop once the queue has drained
+    for writer in writers:
+        writeQueue.put(None)
+    for writer in writers:
+        writer.join()
+    manifestLog.close()
+elapsed = max(time.time() - startTime, 0.001)
+
+# Compact the manifest to one line per attachment
+tempManifest = manifestPath + ".tmp"
+with open(tempManifest, 'w') as manifestFile:
+    for attachmentId in sorted(manifest):
+        manifestFile.write(json.dumps(manifest[attachmentId]) + "\n")
+os.remove(manifestPath)
+os.rename(tempManifest, manifestPath)
+
+# Index of attachments and the store file holding each one. A run that is not
+# deduplicated writes plain files, so only attachments it did not export are still
+# in the store, the index is removed once none are.
+indexPath = os.path.join(fileLocation, "attachment_index.csv")
+storeRecords = [manifest[attachmentId] for attachmentId in sorted(manifest) if "store" in manifest[attachmentId]]
+if storeRecords:
+    with open(indexPath, 'w') as indexFile:
+        writer = csv.writer(indexFile, lineterminator="\n")
+        writer.writerow(["ATTACHMENTID", "ATT_NAME", "file", "store", "md5", "size"])
+        for record in storeRecords:
+            writer.writerow([record["ATTACHMENTID"], record["ATT_NAME"], record["file"], record["store"], record["md5"], record["size"]])
+elif os.path.isfile(indexPath):
+    os.remove(indexPath)
+
+# Remove store files left by a deduplicated export that no attachment uses any more
+storeFolder = os.path.join(fileLocation, "_store")
+if not deduplicate and os.path.isdir(storeFolder):
+    storeNames = set(os.path.normcase(record["store"]) for record in storeRecords)
+    for folder, subfolders, files in os.walk(storeFolder, topdown=False):
+        for name in files:
+            storePath = os.path.join(folder, name)
+            if os.path.normcase(os.path.relpath(storePath, fileLocation)) not in storeNames:
+                try:
+                    os.remove(storePath)
+                except OSError as err:
+                    writeErrors.append("{0}: {1}".format(storePath, err))
+        if not os.listdir(folder):
+            os.rmdir(folder)
+
+for error in writeErrors:
+    arcpy.AddWarning("Attachment could not be written - " + error)
+
+megabytes = stats["bytes"] / (1024.0 * 1024.0)
+arcpy.AddMessage("Skipped {0} attachments that were already exported and unchanged".format(skipped))
+arcpy.AddMessage("Exported {0} attachments ({1:.1f} MB) in {2:.1f} seconds".format(stats["files"], megabytes, elapsed))
+arcpy.AddMessage("Throughput: {0:.1f} files/s, {1:.1f} MB/s".format(stats["files"] / elapsed, megabytes / elapsed))
+if deduplicate:
+    arcpy.AddMessage("Stored {0} new distinct attachments ({1:.1f} MB written)".format(
+        stats["stored"], stats["storedBytes"] / (1024.0 * 1024.0)))
+    if not canLink:
+        arcpy.AddMessage("Links are not available, see attachment_index.csv for the store file of each attachment")
@@ -7,6 +7,24 @@
 #              	Version 1.1 - Checks if folder called "pdf" exists within the
 #              	workspace, previous version would fail if folder did not exist.
 #              	If folder does not exist it will be created before exporting maps.
+#              	Version 1.2 - Map documents can be exported by a pool of worker
+#              	processes, the number of workers is an optional tool parameter.
+#              	Time and status of each map document are written to
+#              	Export_Summary.txt in the PDF folder.
+#              	Version 1.3 - Keeps a cache of the mxd size and modified time, the
+#              	date text and the pdf modified time in Export_Cache.json in the PDF
+#              	folder. Map documents that have not changed since their last export
+#              	with the same date are skipped without being opened. Map documents
+#              	that already have the date are not saved again, and are not exported
+#              	again if the pdf is newer than the mxd.
+#              	Version 1.4 - Optionally searches subfolders of the workspace for map
+#              	documents, with include and exclude file name patterns. Map
+#              	documents are exported as they are found and each pdf is written to
+#              	a PDF folder next to its mxd. The export cache and summary report
+#              	are kept in the workspace folder.
+#              	Version 1.5 - Optionally splits data driven pages into page ranges
+#              	that are exported by the worker pool and merged into the final pdf.
+#              	A range that fails is retried on its own.
 #
 # Usage:		This code is provided as an example only. Usage of this code requires
 #				map layouts with a text layout element named "Date" to be modified
@@ -15,74 +33,373 @@
 # Author:      	Skultety
 #
 # Created:     	09/18/2012
-# Updated:      01/20/2016
+# Updated:      10/18/2026
 # Copyright:   	(c) Skultety 2016
 #-------------------------------------------------------------------------------
 
 #Import modules
 import arcpy
+import fnmatch
+import json
+import multiprocessing
 import os
+import sys
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
 
-#Get parameters
-#Project workspace is folder
-projectWorkspace = arcpy.GetParameterAsText(0)
-#Date is text string
-newDate = arcpy.GetParameterAsText(1)
-
-#Set enviroment variables
-arcpy.env.workspace = projectWorkspace
-
-#Loops through mxd files
-for filename in os.listdir(projectWorkspace):
-    fullpath = os.path.join(projectWorkspace, filename)
-    if os.path.isfile(fullpath):
-        if filename.lower().endswith(".mxd"):
-
-            mxd = arcpy.mapping.MapDocument(fullpath)
-            #Gets the mxd file name to use in the pdf name
-            mxdName = filename[:-4]
-
-            #Change Date
-            try:
-                #Select DATE element in map layout.
-                for elm in arcpy.mapping.ListLayoutElements(mxd, "TEXT_ELEMENT"):
-                    if elm.name == "Date":
-                        #Replace text
-                        elm.text = newDate
-
-                #Save MXD
-                mxd.save()
-
-            except:
-                arcpy.AddError("Step 1 FAILED!")
-
-            #Export Map
-            if os.path.isdir(projectWorkspace + "\\PDF"):
-                try:
-                    #Determine if mxd has data driven pages
-                    if hasattr (mxd, 'dataDrivenPages'):
-                        #If it has data driven pages will export all pages
-                        mxd.dataDrivenPages.exportToPDF(projectWorkspace + "\\PDF\\" + mxdName,"ALL")
-                    #Else export map
-                    else:
-                        arcpy.mapping.ExportToPDF(mxd, projectWorkspace + "\\PDF\\" + mxdName)
-
-                except:
-                    arcpy.AddError("Step 2 FAILED!")
-
-            else:
-                try:
-                    os.mkdir(projectWorkspace + "\\PDF")
-                    #Determine if mxd has data driven pages
-                    if hasattr (mxd, 'dataDrivenPages'):
-                        #If it has data driven pages will export all pages
-                        mxd.dataDrivenPages.exportToPDF(projectWorkspace + "\\PDF\\" + mxdName,"ALL")
-                    #Else export map
-                    else:
-                        arcpy.mapping.ExportToPDF(mxd, projectWorkspace + "\\PDF\\" + mxdName)
-
-                except:
-                    arcpy.AddError("Step 2 FAILED!")
-
-#Delete variables from entire tool
-del projectWorkspace, newDate
\ No newline at end of file
+#Returns True if a file or folder name matches any of the patterns
+def MatchesAny(name, patterns):
+    name = name.lower()
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(name, pattern):
+            return True
+    return False
+
+#Walks a folder and yields map documents as they are found, so exports can
+#start before the whole tree has been read. Files in a folder are yielded
+#before its subfolders are opened.
+def FindMapDocuments(folder, includes, excludes, recursive, errors):
+    try:
+        if scandir is not None:
+            entries = [(entry.name, entry.path, entry.is_dir(), entry.is_file()) for entry in scandir(folder)]
+        else:
+            entries = []
+            for name in os.listdir(folder):
+                path = os.path.join(folder, name)
+                entries.append((name, path, os.path.isdir(path), os.path.isfile(path)))
+    except OSError as err:
+        errors.append("Folder could not be read - {0}".format(err))
+        return
+    subfolders = []
+    for name, path, isDir, isFile in sorted(entries):
+        if MatchesAny(name, excludes):
+            continue
+        if isFile and MatchesAny(name, includes):
+            yield path
+        elif isDir and recursive:
+            subfolders.append(path)
+    for subfolder in subfolders:
+        for path in FindMapDocuments(subfolder, includes, excludes, recursive, errors):
+            yield path
+
+#Returns the fingerprint of a map document and its pdf, used by the export cache
+def Fingerprint(fullpath, pdfPath, newDate):
+    mxdStat = os.stat(fullpath)
+    if os.path.isfile(pdfPath):
+        pdfMtime = os.path.getmtime(pdfPath)
+    else:
+        pdfMtime = None
+    return {"mxdMtime": mxdStat.st_mtime, "mxdSize": mxdStat.st_size, "date": newDate, "pdfMtime": pdfMtime}
+
+#Changes the date and exports one map document. Runs in a worker process when
+#more than one worker is used, so results are returned to the main process
+#instead of being added as tool messages here.
+def UpdateAndExport(task):
+    fullpath, newDate, pdfFolder, pagesPerRange = task
+    startTime = time.time()
+    result = {"mxd": fullpath, "status": "OK", "errors": [], "seconds": 0.0, "fingerprint": None}
+    #Gets the mxd file name to use in the pdf name
+    mxdName = os.path.splitext(os.path.basename(fullpath))[0]
+    pdfPath = os.path.join(pdfFolder, mxdName + ".pdf")
+    try:
+        mxd = arcpy.mapping.MapDocument(fullpath)
+    except Exception as err:
+        result["status"] = "FAILED"
+        result["errors"].append("Map document could not be opened - {0}".format(err))
+        result["seconds"] = time.time() - startTime
+        return result
+
+    #Change Date
+    dateChanged = False
+    try:
+        #Select DATE element in map layout.
+        for elm in arcpy.mapping.ListLayoutElements(mxd, "TEXT_ELEMENT"):
+            if elm.name == "Date" and elm.text != newDate:
+                #Replace text
+                elm.text = newDate
+                dateChanged = True
+
+        #Save MXD only if the date changed, saving would make the pdf out of date
+        if dateChanged:
+            mxd.save()
+
+    except Exception as err:
+        result["status"] = "FAILED"
+        result["errors"].append("Step 1 FAILED! {0}".format(err))
+
+    #Skip export if the date was already set and the pdf is newer than the mxd
+    if not dateChanged and not result["errors"] and os.path.isfile(pdfPath) \
+            and os.path.getmtime(pdfPath) >= os.path.getmtime(fullpath):
+        del mxd
+        result["status"] = "UNCHANGED"
+        result["fingerprint"] = Fingerprint(fullpath, pdfPath, newDate)
+        result["seconds"] = time.time() - startTime
+        return result
+
+    #Export Map
+    try:
+        #Data driven pages are split into ranges exported by the pool, the
+        #main process merges them when all ranges are done
+        if pagesPerRange and hasattr (mxd, 'dataDrivenPages') and mxd.dataDrivenPages.pageCount > pagesPerRange:
+            pageCount = mxd.dataDrivenPages.pageCount
+            result["status"] = "SPLIT"
+            result["ranges"] = []
+            for firstPage in range(1, pageCount + 1, pagesPerRange):
+                lastPage = min(firstPage + pagesPerRange - 1, pageCount)
+                result["ranges"].append("{0}-{1}".format(firstPage, lastPage))
+        #Determine if mxd has data driven pages
+        elif hasattr (mxd, 'dataDrivenPages'):
+            #If it has data driven pages will export all pages
+            mxd.dataDrivenPages.exportToPDF(os.path.join(pdfFolder, mxdName), "ALL")
+        #Else export map
+        else:
+            arcpy.mapping.ExportToPDF(mxd, os.path.join(pdfFolder, mxdName))
+
+    except Exception as err:
+        result["status"] = "FAILED"
+        result["errors"].append("Step 2 FAILED! {0}".format(err))
+
+    del mxd
+    if result["status"] == "OK":
+        result["fingerprint"] = Fingerprint(fullpath, pdfPath, newDate)
+    result["seconds"] = time.time() - startTime
+    return result
+
+#Exports one range of data driven pages to a part pdf
+def ExportPageRange(task):
+    fullpath, partPath, pageRange = task
+    startTime = time.time()
+    result = {"mxd": fullpath, "part": partPath, "range": pageRange, "error": None, "seconds": 0.0}
+    try:
+        mxd = arcpy.mapping.MapDocument(fullpath)
+        mxd.dataDrivenPages.exportToPDF(partPath, "RANGE", pageRange)
+        del mxd
+    except Exception as err:
+        result["error"] = str(err)
+    result["seconds"] = time.time() - startTime
+    return result
+
+#Runs a task in a worker and returns its kind with the result. Errors are
+#always returned so the main process never waits on a task that died.
+def RunTask(kind, task):
+    try:
+        if kind == "document":
+            return kind, UpdateAndExport(task)
+        return kind, ExportPageRange(task)
+    except Exception as err:
+        if kind == "document":
+            return kind, {"mxd": task[0], "status": "FAILED", "errors": ["Task FAILED! {0}".format(err)],
+                          "seconds": 0.0, "fingerprint": None}
+        return kind, {"mxd": task[0], "part": task[1], "range": task[2], "error": str(err), "seconds": 0.0}
+
+#Runs tasks in this process when only one worker is used
+class SerialPool(object):
+    def apply_async(self, func, args, callback):
+        callback(func(*args))
+    def close(self):
+        pass
+    def join(self):
+        pass
+
+if __name__ == '__main__':
+    #Get parameters
+    #Project workspace is folder
+    projectWorkspace = arcpy.GetParameterAsText(0)
+    #Date is text string
+    newDate = arcpy.GetParameterAsText(1)
+    #Number of worker processes is optional, default exports in this process
+    workerCount = arcpy.GetParameterAsText(2)
+    if workerCount:
+        workerCount = max(1, int(workerCount))
+    else:
+        workerCount = 1
+    #File name patterns separated by semicolons, default is all mxd files
+    includes = [pattern.strip().lower() for pattern in (arcpy.GetParameterAsText(3) or "*.mxd").split(";") if pattern.strip()]
+    excludes = [pattern.strip().lower() for pattern in arcpy.GetParameterAsText(4).split(";") if pattern.strip()]
+    #Search subfolders unless turned off
+    recursive = arcpy.GetParameterAsText(5).lower() != "false"
+    #Number of data driven pages per range, default exports all pages at once
+    pagesPerRange = arcpy.GetParameterAsText(6)
+    if pagesPerRange:
+        pagesPerRange = max(0, int(pagesPerRange))
+    else:
+        pagesPerRange = 0
+    #Number of times a failed page range is tried before the map fails
+    rangeAttempts = 3
+
+    #Set enviroment variables
+    arcpy.env.workspace = projectWorkspace
+
+    #Read export cache from previous runs
+    cachePath = os.path.join(projectWorkspace, "Export_Cache.json")
+    cache = {}
+    if os.path.isfile(cachePath):
+        try:
+            with open(cachePath, "r") as cacheFile:
+                cache = json.load(cacheFile)
+        except ValueError:
+            arcpy.AddWarning("Export cache could not be read, all maps will be exported")
+
+    #Turns found map documents into export tasks, one per map document. Map
+    #documents whose fingerprint matches the cache are skipped without being
+    #opened. The PDF folder next to each mxd is created if it does not exist.
+    skipped = [0]
+    discoveryErrors = []
+    def ExportTasks():
+        for fullpath in FindMapDocuments(projectWorkspace, includes, excludes, recursive, discoveryErrors):
+            pdfFolder = os.path.join(os.path.dirname(fullpath), "PDF")
+            pdfPath = os.path.join(pdfFolder, os.path.splitext(os.path.basename(fullpath))[0] + ".pdf")
+            fingerprint = Fingerprint(fullpath, pdfPath, newDate)
+            if fingerprint["pdfMtime"] is not None and cache.get(fullpath) == fingerprint:
+                skipped[0] += 1
+                continue
+            if not os.path.isdir(pdfFolder):
+                os.mkdir(pdfFolder)
+            yield (fullpath, newDate, pdfFolder, pagesPerRange)
+
+    totalStart = time.time()
+    if workerCount > 1:
+        #ArcMap runs script tools inside its own process, workers must be
+        #started with the python interpreter instead of ArcMap
+        if not os.path.basename(sys.executable).lower().startswith("python"):
+            multiprocessing.set_executable(os.path.join(sys.exec_prefix, "pythonw.exe"))
+        pool = multiprocessing.Pool(workerCount)
+    else:
+        pool = SerialPool()
+
+    #Finished tasks are put on this queue by the pool and handled here
+    completed = queue.Queue()
+    pending = [0]
+    def Submit(kind, task):
+        pending[0] += 1
+        pool.apply_async(RunTask, (kind, task), callback=completed.put)
+
+    #Map documents split into page ranges that are still exporting
+    splits = {}
+    summary = []
+
+    #Reports a finished map document and updates the cache
+    def Finish(result):
+        for error in result["errors"]:
+            arcpy.AddError(os.path.basename(result["mxd"]) + " - " + error)
+        arcpy.AddMessage("{0} {1} in {2:.1f} seconds".format(os.path.basename(result["mxd"]), result["status"], result["seconds"]))
+        summary.append(result)
+        if result["fingerprint"] is not None:
+            cache[result["mxd"]] = result["fingerprint"]
+        else:
+            cache.pop(result["mxd"], None)
+
+    #Merges the part pdfs of a split map document into the final pdf
+    def MergeParts(split):
+        result = split["result"]
+        pdfPath = split["pdfPath"]
+        try:
+            if os.path.isfile(pdfPath):
+                os.remove(pdfPath)
+            pdfDoc = arcpy.mapping.PDFDocumentCreate(pdfPath)
+            for partPath in split["parts"]:
+                pdfDoc.appendPages(partPath)
+            pdfDoc.saveAndClose()
+            del pdfDoc
+            result["status"] = "OK"
+            result["fingerprint"] = Fingerprint(result["mxd"], pdfPath, newDate)
+        except Exception as err:
+            result["status"] = "FAILED"
+            result["errors"].append("Step 3 FAILED! Page ranges could not be merged - {0}".format(err))
+        for partPath in split["parts"]:
+            if os.path.isfile(partPath):
+                os.remove(partPath)
+
+    #Handles one finished task, page ranges are queued when a map document is
+    #split and a failed range is queued again until it runs out of attempts
+    def Handle(kind, result):
+        if kind == "document":
+            if result["status"] != "SPLIT":
+                Finish(result)
+                return
+            pdfFolder = os.path.join(os.path.dirname(result["mxd"]), "PDF")
+            mxdName = os.path.splitext(os.path.basename(result["mxd"]))[0]
+            split = {"result": result, "pdfPath": os.path.join(pdfFolder, mxdName + ".pdf"),
+                     "parts": [], "remaining": set(), "attempts": {}, "start": time.time()}
+            for index, pageRange in enumerate(result["ranges"]):
+                partPath = os.path.join(pdfFolder, "{0}_part{1:03d}.pdf".format(mxdName, index + 1))
+                split["parts"].append(partPath)
+                split["remaining"].add(partPath)
+                split["attempts"][partPath] = 1
+                Submit("range", (result["mxd"], partPath, pageRange))
+            splits[result["mxd"]] = split
+            arcpy.AddMessage("{0} split into {1} page ranges".format(os.path.basename(result["mxd"]), len(result["ranges"])))
+            return
+
+        split = splits[result["mxd"]]
+        if result["error"] is not None:
+            if split["attempts"][result["part"]] < rangeAttempts:
+                split["attempts"][result["part"]] += 1
+                arcpy.AddWarning("{0} pages {1} failed, trying again".format(os.path.basename(result["mxd"]), result["range"]))
+                Submit("range", (result["mxd"], result["part"], result["range"]))
+                return
+            split["result"]["errors"].append("Step 2 FAILED! Pages {0} - {1}".format(result["range"], result["error"]))
+        split["remaining"].discard(result["part"])
+        if split["remaining"]:
+            return
+        del splits[result["mxd"]]
+        if split["result"]["errors"]:
+            split["result"]["status"] = "FAILED"
+            for partPath in split["parts"]:
+                if os.path.isfile(partPath):
+                    os.remove(partPath)
+        else:
+            MergeParts(split)
+        split["result"]["seconds"] += time.time() - split["start"]
+        Finish(split["result"])
+
+    #Waits for one finished task and handles it
+    def HandleNext(block):
+        try:
+            kind, result = completed.get(block)
+        except queue.Empty:
+            return
+        pending[0] -= 1
+        Handle(kind, result)
+
+    try:
+        #Queue map documents as they are found, handling finished ones in between
+        for task in ExportTasks():
+            Submit("document", task)
+            while not completed.empty():
+                HandleNext(False)
+        #Wait for the remaining documents and page ranges
+        while pending[0] > 0:
+            HandleNext(True)
+    finally:
+        #Save cache even if the run stops early so a rerun only repeats the rest
+        with open(cachePath, "w") as cacheFile:
+            json.dump(cache, cacheFile, indent=1, sort_keys=True)
+
+    pool.close()
+    pool.join()
+    totalSeconds = time.time() - totalStart
+    skipped = skipped[0]
+    for error in discoveryErrors:
+        arcpy.AddWarning(error)
+    if skipped:
+        arcpy.AddMessage("{0} map documents unchanged since last export, skipped".format(skipped))
+
+    #Write summary report to the workspace folder
+    with open(os.path.join(projectWorkspace, "Export_Summary.txt"), "w") as report:
+        report.write("Map Document\tStatus\tSeconds\tMessage\n")
+        for result in sorted(summary, key=lambda r: r["mxd"].lower()):
+            report.write("{0}\t{1}\t{2:.1f}\t{3}\n".format(result["mxd"], result["status"], result["seconds"], "; ".join(result["errors"])))
+        failed = len([result for result in summary if result["status"] == "FAILED"])
+        report.write("\n{0} map documents, {1} failed, {2} skipped from cache, {3} workers, {4:.1f} seconds total\n".format(len(summary), failed, skipped, workerCount, totalSeconds))
+    arcpy.AddMessage("{0} map documents exported in {1:.1f} seconds".format(len(summary), totalSeconds))
+
+    #Delete variables from entire tool
+    del projectWorkspace, newDate
@@ -10,7 +10,7 @@
 # Author:       Skultety
 #
 # Created:      04/24/2012
-# Updated:      03/07/2018
+# Updated:      10/18/2026
 #
 # Upgrades:     Version 1.1 was upgraded from version 1.0 to create subfolders in
 #               Shapefiles Final folder for shapefiles and dgn files. Names of
@@ -25,152 +25,364 @@
 #               Version 2.3 uses a user specified location where the project should
 #               be created, replaces in progress folder with a file geodatabase, and
 #               uses mxd templates that are locared on the network. 
+#               Version 2.4 (10/18/2026) county zone and District 1 status are read
+#               from Illinois_Counties.csv into an index keyed by normalized county
+#               name, so any capitalization, spacing or punctuation of a county
+#               name is accepted.
+#               Version 2.5 (10/18/2026) optional batch mode creates every project
+#               listed in a CSV or JSON manifest using a pool of worker processes.
+#               Existing projects are skipped and missing folders, geodatabase or
+#               figures of partly created projects are added. A timing summary is
+#               written next to the manifest.
+#               Version 2.6 (10/18/2026) map templates are copied from the network
+#               to a local cache that is refreshed when the network template's
+#               modified time or size changes. Figures are file copies of the cached
+#               template instead of a saveACopy of the network template.
+#               Version 2.7 (10/18/2026) figures are defined in a rule table that is
+#               compiled into a figure set for each project size and District 1
+#               status. All projects are planned in one pass. The folders and
+#               geodatabase of each project are created by a pool of worker
+#               processes and the figure copies are made by a pool of threads.
 #-------------------------------------------------------------------------------------
 
 # Import modules
 import arcpy
+import csv
+import json
+import multiprocessing
+import multiprocessing.pool
 import os
+import re
+import shutil
 import sys
+import tempfile
+import time
 
-# USER INPUTS FOR TOOL
-# Use script tool interface to get user generated inputs
-# Uses Arc Get Parameter as Text to get raw input of project directory
-projectDirectory = arcpy.GetParameterAsText(0)
-# Uses Arc Get Parameter as Text to get raw input of project name
-projectName = arcpy.GetParameterAsText(1)
-projectName = "\\" + projectName
-# Uses Arc Get Parameter as Text to get raw input of project county
-# This parameter is case sensitive!
-# The next step will stop the script if entered county name is not in lists
-projectCounty = arcpy.GetParameterAsText(2)
-# Uses Arc Get Parameter as Text to get raw input of project size
-projectSize = arcpy.GetParameterAsText(3)
-
-# DETERMINE STATE PLANE ZONE PROJECT IS IN BY COUNTY NAME
-# Selects map template to use
-# Counties in State Plane East Zone
-countyListEast = ("Boone","Champaign","Clark","Clay","Coles","Cook","Crawford","Cumberland","Dekalb","De Kalb","DeKalb","Dewitt","De Witt","DeWitt","Douglas",\
-"Dupage","DuPage","Du Page","Edgar","Edwards","Effingham","Fayette","Ford","Franklin","Gallatin","Grundy","Hamilton","Hardin","Iroquois","Jasper","Jefferson",\
-"Johnson","Kane","Kankakee","Kendall","Lake","Lasalle","La Salle","LaSalle","Lawrence","Livingston","Macon","Marion","Massac","Mchenry","Mc Henry","McHenry",\
-"Mclean","Mc Lean","McLean","Moultrie","Piatt","Pope","Richland","Saline","Shelby","Vermilion","Wabash","Wayne","White","Will","Williamson")
-# Counties in State Plane West Zone
-countyListWest = ("Adams","Alexander","Bond","Brown","Bureau","Calhoun","Carroll","Cass","Christian","Clinton","Fulton","Greene","Hancock","Henderson","Henry",\
-"Jackson","Jersey","Jo Daviess","JoDaviess","Jodaviess","Knox","Lee","Logan","Macoupin","Madison","Marshall","Mason","Mcdonough","McDonough","Mc Donough","Menard",\
-"Mercer","Monroe","Montgomery","Morgan","Ogle","Peoria","Perry","Pike","Pulaski","Putnam","Randolph","Rock Island","Sangamon","Schuyler","Scott","St. Clair","St.Clair",\
-"Saint Clair","Stark","Stephenson","Tazewell","Union","Warren","Washington","Whiteside","Winnebago","Woodford")
-
-# Check if project county is in state plane zone East
-if projectCounty in countyListEast:
-    # Selects mxd template file East
-    mxd = arcpy.mapping.MapDocument(r"redacted_path\StPl_IL_East_Blank.mxd")
-# If project county was not in state plane zone East then check if zone West
-elif projectCounty in countyListWest:
-    # Selects mxd template file West
-    mxd = arcpy.mapping.MapDocument(r"redacted_path\StPl_IL_West_Blank.mxd")
-    # If project county not in east or west list then script will stop and error message will be generated
-else:
-    arcpy.AddError("Error - County Not In List")
-    arcpy.AddError("Check spelling & capitalization of county name")
-    arcpy.AddError("Tool stopped, project not created")
-    sys.exit()
-
-# MAKE NEW DIRECTORY
-# Makes folder within designated project directory with given project name
-os.mkdir(projectDirectory + projectName)
-# Creates subfolders within above created project folder
-os.mkdir(projectDirectory + projectName + "\\GNSS")
-os.mkdir(projectDirectory + projectName + "\\PDF")
-os.mkdir(projectDirectory + projectName + "\\Notes")
-os.mkdir(projectDirectory + projectName + "\\Files from IDOT")
-os.mkdir(projectDirectory + projectName + "\\GIS Files Final")
-arcpy.CreateFileGDB_management(projectDirectory + projectName, "In_Progress.gdb")
-
-# Creates subfolders with "GIS Files Final" folder, folder names are based upon state plane zone.
-# Check if project county is in state pLane zone East
-if projectCounty in countyListEast:
-    os.mkdir(projectDirectory + projectName + "\\GIS Files Final\\Shapefiles_IL_StPL_East_NAD83")
-    os.mkdir(projectDirectory + projectName + "\\GIS Files Final\\DGN_files_IL_StPL_East_NAD83")
-# If project county was not in state pLane zone East then check if zone West
-elif projectCounty in countyListWest:
-    os.mkdir(projectDirectory + projectName + "\\GIS Files Final\\Shapefiles_IL_StPL_West_NAD83")
-    os.mkdir(projectDirectory + projectName + "\\GIS Files Final\\DGN_files_IL_StPL_West_NAD83")
-
-
-# CREATE INDIVIDUAL MXD FILES BASED ON COUNTY
-# Output directory to write files to
-outputDirectory = projectDirectory + projectName
-# District 1 county lists
-# List of counties in District 1 with ADID or county inventory maps
-countyListDistrict1ADID = ("DuPage", "Du Page", "Dupage", "Kane", "Lake", "McHenry", "Mc Henry", "Mchenry")
-# List of counties in District 1 without ADID or county inventory maps
-countyListDistrict1NoADID = ("Cook", "Will")
-
-if projectSize == "Small":
-    if projectCounty in countyListDistrict1ADID:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 ADID Map
-        mxd.saveACopy(outputDirectory + "\\Fig3_ADID.mxd")
-        # Save a copy as Figure 4 Soils
-        mxd.saveACopy(outputDirectory + "\\Fig4_Soils.mxd")
-        # Save a copy as Figure 5 Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig5_Determination_Map.mxd")
-
-    elif projectCounty in countyListDistrict1NoADID:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 Soils
-        mxd.saveACopy(outputDirectory + "\\Fig3_Soils.mxd")
-        # Save a copy as Figure 4 Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig4_Determination_Map.mxd")
+# COUNTY INDEX
+# Table of Illinois counties with state plane zone and District 1 status, stored
+# next to this script
+countyTable = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Illinois_Counties.csv")
+# Map templates for each state plane zone
+templates = {"East": r"redacted_path\StPl_IL_East_Blank.mxd",
+             "West": r"redacted_path\StPl_IL_West_Blank.mxd"}
+# Local folder the network map templates are cached in
+templateCache = os.path.join(os.environ.get("LOCALAPPDATA", tempfile.gettempdir()), "Wetland_Project_Templates")
 
+# Define function to return the local copy of a network map template. The template is
+# copied again only when the network file's modified time or size differs from the
+# copy recorded in the cache.
+def CachedTemplate(templatePath):
+    if not os.path.isdir(templateCache):
+        os.makedirs(templateCache)
+    cachedPath = os.path.join(templateCache, os.path.basename(templatePath))
+    infoPath = cachedPath + ".json"
+    try:
+        sourceStat = os.stat(templatePath)
+    except OSError:
+        # Network not available, use the cached copy if there is one
+        if os.path.isfile(cachedPath):
+            arcpy.AddWarning("Map template not found on the network, using cached copy: " + templatePath)
+            return cachedPath
+        raise
+    source = {"path": templatePath, "mtime": sourceStat.st_mtime, "size": sourceStat.st_size}
+    if os.path.isfile(cachedPath) and os.path.isfile(infoPath):
+        with open(infoPath, "r") as infoFile:
+            try:
+                cached = json.load(infoFile)
+            except ValueError:
+                cached = None
+        if cached == source and os.path.getsize(cachedPath) == source["size"]:
+            return cachedPath
+    # Copy to a temporary name first so a failed copy never leaves a partial template
+    shutil.copyfile(templatePath, cachedPath + ".tmp")
+    if os.path.isfile(cachedPath):
+        os.remove(cachedPath)
+    os.rename(cachedPath + ".tmp", cachedPath)
+    with open(infoPath, "w") as infoFile:
+        json.dump(source, infoFile)
+    return cachedPath
+
+# Define function to reduce a county name to a lookup key
+# "De Kalb", "Dekalb" and "DeKalb" all become "dekalb", "Saint Clair" becomes "stclair"
+def NormalizeCounty(countyName):
+    key = re.sub(r"[^a-z]", "", countyName.lower())
+    if key.endswith("county"):
+        key = key[:-6]
+    if key.startswith("saint"):
+        key = "st" + key[5:]
+    return key
+
+# Define function to read the county table into a dictionary keyed by normalized name
+# District1 is "ADID" for District 1 counties with ADID or county inventory maps,
+# "NoADID" for District 1 counties without them and empty for all other counties
+def LoadCountyIndex(tablePath):
+    index = {}
+    with open(tablePath, "r") as table:
+        for row in csv.DictReader(table):
+            index[NormalizeCounty(row["County"])] = {"name": row["County"], "zone": row["Zone"],
+                                                     "district": row["District1"]}
+    return index
+
+countyIndex = LoadCountyIndex(countyTable)
+
+# FIGURE SETS
+# Each figure is listed once with the project sizes and District 1 status it is made
+# for. District 1 status is "ADID" or "NoADID" for District 1 counties and empty for
+# all other counties. Figures are numbered in the order they are listed.
+projectSizes = ("Small", "Large")
+districts = ("ADID", "NoADID", "")
+figureRules = [
+    # Figure Project Location Map
+    ("Project_Location", projectSizes, districts),
+    # Figure NWI
+    ("NWI", projectSizes, districts),
+    # Figure ADID Map
+    ("ADID", projectSizes, ("ADID",)),
+    # Figure Soils
+    ("Soils", projectSizes, ("ADID", "NoADID")),
+    # Figure Determination Overview Map
+    ("Overview_Map", ("Large",), districts),
+    # Figure Wetland Determination Map
+    ("Determination_Map", projectSizes, districts),
+]
+
+# Define function to compile the figure rules into the list of figure file names for
+# each (project size, District 1 status)
+def CompileFigureSets(rules):
+    figureSets = {}
+    for size in projectSizes:
+        for district in districts:
+            figures = []
+            for name, sizes, ruleDistricts in rules:
+                if size in sizes and district in ruleDistricts:
+                    figures.append("Fig{0}_{1}.mxd".format(len(figures) + 1, name))
+            figureSets[(size, district)] = figures
+    return figureSets
+
+figureSets = CompileFigureSets(figureRules)
+
+# Define function to plan every folder, geodatabase and figure that has to be written
+# for a list of projects. Anything that already exists is left out, so running the plan
+# again on a partly created project adds only what is missing. A path is only planned
+# once even if two projects in the list share it.
+def PlanProjects(jobs):
+    plan = {"projects": [], "folders": [], "gdbs": [], "figures": []}
+    planned = set()
+    for projectDirectory, projectName, projectCounty, projectSize, templatePath in jobs:
+        # DETERMINE STATE PLANE ZONE PROJECT IS IN BY COUNTY NAME
+        county = countyIndex[NormalizeCounty(projectCounty)]
+        outputDirectory = os.path.join(projectDirectory, projectName)
+        project = {"project": outputDirectory, "existed": os.path.isdir(outputDirectory), "status": "EXISTS",
+                   "created": 0, "errors": [], "seconds": 0.0}
+        plan["projects"].append(project)
+
+        # MAKE NEW DIRECTORY
+        # Project folder, subfolders and subfolders of "GIS Files Final" based upon state plane zone
+        folders = ["", "GNSS", "PDF", "Notes", "Files from IDOT", "GIS Files Final",
+                   os.path.join("GIS Files Final", "Shapefiles_IL_StPL_" + county["zone"] + "_NAD83"),
+                   os.path.join("GIS Files Final", "DGN_files_IL_StPL_" + county["zone"] + "_NAD83")]
+        writes = [("folders", os.path.join(outputDirectory, folder), None) for folder in folders]
+        writes.append(("gdbs", os.path.join(outputDirectory, "In_Progress.gdb"), None))
+
+        # CREATE INDIVIDUAL MXD FILES BASED ON COUNTY
+        # Each figure is a copy of the cached blank map template
+        for figure in figureSets[(projectSize, county["district"])]:
+            writes.append(("figures", os.path.join(outputDirectory, figure), templatePath))
+
+        for kind, path, source in writes:
+            key = os.path.normcase(os.path.normpath(path))
+            if key in planned or os.path.exists(path):
+                continue
+            planned.add(key)
+            plan[kind].append((project, path, source))
+    return plan
+
+# Define function to create the planned folders and geodatabase of one project, run by
+# the pool of worker processes. Returns the project number, count of items created,
+# errors and time taken.
+def BuildProject(task):
+    number, folderPaths, gdbPaths = task
+    startTime = time.time()
+    created = 0
+    errors = []
+    # Parents are planned before their subfolders
+    for folderPath in folderPaths:
+        try:
+            os.mkdir(folderPath)
+            created += 1
+        except OSError as err:
+            errors.append("{0} - {1}".format(folderPath, err))
+    for gdbPath in gdbPaths:
+        try:
+            arcpy.CreateFileGDB_management(os.path.dirname(gdbPath), os.path.basename(gdbPath))
+            created += 1
+        except Exception as err:
+            errors.append("{0} - {1}".format(gdbPath, err))
+    return number, created, errors, time.time() - startTime
+
+# Define function to copy one figure, run by the thread pool
+# Copied to a temporary name first so an interrupted copy never leaves a partial figure
+# that a later run would take as already created
+def CopyFigure(write):
+    project, figurePath, templatePath = write
+    startTime = time.time()
+    try:
+        shutil.copyfile(templatePath, figurePath + ".tmp")
+        if os.path.isfile(figurePath):
+            os.remove(figurePath)
+        os.rename(figurePath + ".tmp", figurePath)
+        return project, None, time.time() - startTime
+    except (IOError, OSError) as err:
+        return project, "{0} - {1}".format(os.path.basename(figurePath), err), time.time() - startTime
+
+# Define function to read the batch manifest, a CSV file with a header row or a JSON
+# list of objects, both with Directory, Name, County and Size
+def ReadManifest(manifestPath):
+    if manifestPath.lower().endswith(".json"):
+        with open(manifestPath, "r") as manifestFile:
+            rows = json.load(manifestFile)
     else:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 Wetland Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig3_Determination_Map.mxd")
-
-elif projectSize == "Large":
-    if projectCounty in countyListDistrict1ADID:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 ADID Map
-        mxd.saveACopy(outputDirectory + "\\Fig3_ADID.mxd")
-        # Save a copy as Figure 4 Soils
-        mxd.saveACopy(outputDirectory + "\\Fig4_Soils.mxd")
-        # Save a copy as Figure 5 Determination Overview Map
-        mxd.saveACopy(outputDirectory + "\\Fig5_Overview_Map.mxd")
-        # Save a copy as Figure 6 Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig6_Determination_Map.mxd")
-
-    elif projectCounty in countyListDistrict1NoADID:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 Soils
-        mxd.saveACopy(outputDirectory + "\\Fig3_Soils.mxd")
-        # Save a copy as Figure 4 Determination Overview Map
-        mxd.saveACopy(outputDirectory + "\\Fig4_Overview_Map.mxd")
-        # Save a copy as Figure 4 Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig5_Determination_Map.mxd")
+        with open(manifestPath, "r") as manifestFile:
+            rows = list(csv.DictReader(manifestFile))
+    jobs = []
+    for row in rows:
+        row = dict((str(key).strip().lower(), str(value).strip()) for key, value in row.items() if key)
+        jobs.append((row.get("directory", ""), row.get("name", ""), row.get("county", ""), row.get("size", "")))
+    return jobs
 
+if __name__ == '__main__':
+    # USER INPUTS FOR TOOL
+    # Use script tool interface to get user generated inputs
+    # Uses Arc Get Parameter as Text to get raw input of project directory
+    projectDirectory = arcpy.GetParameterAsText(0)
+    # Uses Arc Get Parameter as Text to get raw input of project name
+    projectName = arcpy.GetParameterAsText(1)
+    # Uses Arc Get Parameter as Text to get raw input of project county
+    # The next step will stop the script if entered county name is not in the county table
+    projectCounty = arcpy.GetParameterAsText(2)
+    # Uses Arc Get Parameter as Text to get raw input of project size
+    projectSize = arcpy.GetParameterAsText(3)
+    # Optional manifest of projects for batch mode, replaces the four inputs above
+    manifestPath = arcpy.GetParameterAsText(4)
+    # Optional number of worker processes creating projects and threads copying figures
+    workerCount = arcpy.GetParameterAsText(5)
+    if workerCount:
+        workerCount = max(1, int(workerCount))
     else:
-        # Save a copy as Figure 1 Project Location Map
-        mxd.saveACopy(outputDirectory + "\\Fig1_Project_Location.mxd")
-        # Save a copy as Figure 2 NWI
-        mxd.saveACopy(outputDirectory + "\\Fig2_NWI.mxd")
-        # Save a copy as Figure 3 Determination Overview Map
-        mxd.saveACopy(outputDirectory + "\\Fig3_Overview_Map.mxd")
-        # Save a copy as Figure 4 Wetland Determination Map
-        mxd.saveACopy(outputDirectory + "\\Fig4_Determination_Map.mxd")
-
-del mxd, projectCounty, projectDirectory, projectName
+        workerCount = multiprocessing.cpu_count()
+
+    if manifestPath:
+        jobs = ReadManifest(manifestPath)
+    else:
+        jobs = [(projectDirectory, projectName, projectCounty, projectSize)]
+
+    # Check every project before anything is created, duplicate projects are only built once
+    validJobs = []
+    seen = set()
+    for job in jobs:
+        projectPath = os.path.normcase(os.path.join(job[0], job[1]))
+        if not job[0] or not job[1]:
+            arcpy.AddError("Error - Project directory and name are required: " + ", ".join(job))
+        elif NormalizeCounty(job[2]) not in countyIndex:
+            arcpy.AddError("Error - County Not In List: " + job[2] + " for project " + job[1])
+            arcpy.AddError("Check spelling of county name")
+        elif job[3] not in ("Small", "Large"):
+            arcpy.AddError("Error - Project size must be Small or Large: " + job[3] + " for project " + job[1])
+        elif projectPath in seen:
+            arcpy.AddWarning("Project listed more than once, created once: " + job[1])
+        else:
+            seen.add(projectPath)
+            validJobs.append(job)
+    if not manifestPath and not validJobs:
+        arcpy.AddError("Tool stopped, project not created")
+        sys.exit()
+
+    # Refresh the local template cache once before projects are created
+    cachedTemplates = {}
+    for zone in set(countyIndex[NormalizeCounty(job[2])]["zone"] for job in validJobs):
+        try:
+            cachedTemplates[zone] = CachedTemplate(templates[zone])
+        except (IOError, OSError) as err:
+            arcpy.AddError("Error - Map template could not be read: " + str(err))
+            arcpy.AddError("Tool stopped, project not created")
+            sys.exit()
+    validJobs = [job + (cachedTemplates[countyIndex[NormalizeCounty(job[2])]["zone"]],) for job in validJobs]
+
+    # Plan every write for every project in one pass
+    totalStart = time.time()
+    plan = PlanProjects(validJobs)
+    arcpy.AddMessage("Planned {0} folders, {1} geodatabases and {2} figures".format(len(plan["folders"]), len(plan["gdbs"]), len(plan["figures"])))
+
+    # Folders and geodatabases are grouped by project and created by worker processes,
+    # in worker processes when there is more than one project
+    tasks = []
+    for number, project in enumerate(plan["projects"]):
+        folderPaths = [path for owner, path, source in plan["folders"] if owner is project]
+        gdbPaths = [path for owner, path, source in plan["gdbs"] if owner is project]
+        if folderPaths or gdbPaths:
+            tasks.append((number, folderPaths, gdbPaths))
+    if workerCount > 1 and len(tasks) > 1:
+        # ArcMap runs script tools inside its own process, workers must be
+        # started with the python interpreter instead of ArcMap
+        if not os.path.basename(sys.executable).lower().startswith("python"):
+            multiprocessing.set_executable(os.path.join(sys.exec_prefix, "pythonw.exe"))
+        pool = multiprocessing.Pool(min(workerCount, len(tasks)))
+        builds = pool.imap_unordered(BuildProject, tasks)
+    else:
+        pool = None
+        builds = (BuildProject(task) for task in tasks)
+    for number, created, errors, seconds in builds:
+        project = plan["projects"][number]
+        project["created"] += created
+        project["errors"] += errors
+        project["seconds"] += seconds
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+    # Figures are plain file copies, made by a pool of threads
+    figures = [write for write in plan["figures"] if not write[0]["errors"]]
+    if workerCount > 1 and len(figures) > 1:
+        pool = multiprocessing.pool.ThreadPool(min(workerCount, len(figures)))
+        copies = pool.imap_unordered(CopyFigure, figures)
+    else:
+        pool = None
+        copies = (CopyFigure(write) for write in figures)
+    for project, error, seconds in copies:
+        if error is None:
+            project["created"] += 1
+        else:
+            project["errors"].append(error)
+        project["seconds"] += seconds
+    if pool is not None:
+        pool.close()
+        pool.join()
+    totalSeconds = time.time() - totalStart
+
+    summary = plan["projects"]
+    for result in summary:
+        if result["errors"]:
+            result["status"] = "FAILED"
+        elif not result["existed"]:
+            result["status"] = "CREATED"
+        elif result["created"]:
+            result["status"] = "REPAIRED"
+        for error in result["errors"]:
+            arcpy.AddError(result["project"] + " - " + error)
+        arcpy.AddMessage("{0} {1} in {2:.1f} seconds".format(result["project"], result["status"], result["seconds"]))
+
+    # Timing summary
+    counts = {}
+    for result in summary:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    countText = ", ".join("{0} {1}".format(counts[status], status.lower()) for status in sorted(counts))
+    arcpy.AddMessage("{0} projects in {1:.1f} seconds ({2})".format(len(summary), totalSeconds, countText))
+    if manifestPath:
+        summaryPath = os.path.splitext(manifestPath)[0] + "_Summary.txt"
+        with open(summaryPath, "w") as report:
+            report.write("Project\tStatus\tSeconds\tMessage\n")
+            for result in sorted(summary, key=lambda r: r["project"].lower()):
+                report.write("{0}\t{1}\t{2:.1f}\t{3}\n".format(result["project"], result["status"], result["seconds"], "; ".join(result["errors"])))
+            report.write("\n{0} projects, {1}, {2} threads, {3:.1f} seconds total\n".format(len(summary), countText, workerCount, totalSeconds))
+
+    del projectCounty, projectDirectory, projectName
@@ -6,45 +6,256 @@
 # Author:       Skultety - modified from Geonet thread by Blake Terhune titled 'Delete Unused Domains'
 #
 # Created:      02/08/2019
-# Updated:
+# Updated:      10/18/2026
 #
-# Upgrades:
+# Upgrades:     10/18/2026 - Each table and feature class is read with a single Describe,
+#               subtypes are only listed for datasets that have a subtype field. Datasets
+#               are checked by a pool of threads and used domains are collected in a set.
+#               10/18/2026 - Domain usage is kept in a SQLite index next to the geodatabase.
+#               Each run reads the schema of every dataset in one Describe of the
+#               geodatabase and only rechecks datasets whose fields changed since the last
+#               run. The index can be queried for the fields that use a domain without
+#               checking the geodatabase.
+#               10/18/2026 - Unused domains are the existing domains minus the used domains,
+#               the symmetric difference also picked up used domains that do not exist.
+#               A JSON plan with counts is written before anything is deleted and a dry run
+#               stops after the plan. Deletions run as one batch with the time of each
+#               domain recorded in the plan, if one fails the domains already deleted are
+#               created again from their saved definitions.
+#               10/18/2026 - The domains used by each dataset are collected in the same pass
+#               that reads the signatures, datasets are no longer described a second time.
+#               Only the usages of changed datasets are written to the index.
 #--------------------------------------------------------------------------------------------------------
 
 # Import tools
 import arcpy
+import hashlib
+import json
+import multiprocessing.pool
 import os
+import sqlite3
+import time
 
 # Set workspace
 myGDB = arcpy.GetParameterAsText(0)
+# Optional number of threads listing subtypes, defaults to 4
+thread_count = arcpy.GetParameterAsText(1)
+if thread_count:
+    thread_count = max(1, int(thread_count))
+else:
+    thread_count = 4
+# Optional location of the domain usage index, defaults to a file next to the geodatabase
+index_path = arcpy.GetParameterAsText(2)
+if not index_path:
+    index_path = os.path.splitext(myGDB.rstrip("\\/"))[0] + "_DomainIndex.sqlite"
+# Optional domain name, lists the fields that use it from the index and deletes nothing
+query_domain = arcpy.GetParameterAsText(3)
+# Optional full refresh, rechecks every dataset instead of only changed ones
+full_refresh = arcpy.GetParameterAsText(4).lower() == "true"
+# Optional location of the deletion plan, defaults to a file next to the geodatabase
+plan_path = arcpy.GetParameterAsText(5)
+if not plan_path:
+    plan_path = os.path.splitext(myGDB.rstrip("\\/"))[0] + "_DomainPlan.json"
+# Optional dry run, writes the plan without deleting any domains
+dry_run = arcpy.GetParameterAsText(6).lower() == "true"
 
+# Domain properties from arcpy.da.ListDomains and the keywords CreateDomain expects
+field_types = {"SmallInteger": "SHORT", "Short": "SHORT", "Integer": "LONG", "Long": "LONG", "Single": "FLOAT",
+               "Float": "FLOAT", "Double": "DOUBLE", "String": "TEXT", "Text": "TEXT", "Date": "DATE"}
+split_policies = {"DefaultValue": "DEFAULT", "Duplicate": "DUPLICATE", "GeometryRatio": "GEOMETRY_RATIO"}
+merge_policies = {"DefaultValue": "DEFAULT", "SumValues": "SUM_VALUES", "AreaWeighted": "AREA_WEIGHTED"}
 
-# Get domains that are assigned to a field
-domains_used = []
-for dirpath, dirnames, filenames in arcpy.da.Walk(myGDB, datatype=["FeatureClass", "Table"]):
-    for filename in filenames:
-        arcpy.AddMessage("Checking {}".format(os.path.join(dirpath, filename)))
+
+# Define function to open the domain usage index, the tables are created on first use
+# datasets holds the schema signature of each dataset from the last time it was checked
+# usages holds one row for each field or subtype field that uses a domain
+def open_index(path):
+    index = sqlite3.connect(path)
+    index.execute("CREATE TABLE IF NOT EXISTS datasets (dataset TEXT PRIMARY KEY, signature TEXT)")
+    index.execute("CREATE TABLE IF NOT EXISTS usages (domain TEXT, dataset TEXT, field TEXT, subtype TEXT)")
+    index.execute("CREATE INDEX IF NOT EXISTS usages_domain ON usages (domain)")
+    index.execute("CREATE INDEX IF NOT EXISTS usages_dataset ON usages (dataset)")
+    index.commit()
+    return index
+
+
+# Define function to get the domains used by the subtypes of one table or feature class
+# Returns (domain, field, subtype) for each use
+def find_subtype_domains(dataset):
+    used = set()
+    try:
+        for stcode, stdict in arcpy.da.ListSubtypes(dataset).items():
+            if stdict["SubtypeField"] != u'':
+                for field, fieldvals in stdict["FieldValues"].items():
+                    if not fieldvals[1] is None:
+                        used.add((fieldvals[1].name, field, u"{}: {}".format(stcode, stdict["Name"])))
+    except Exception as err:
+        return dataset, used, err
+    return dataset, used, None
+
+
+# Define function to read the domains used by every table and feature class
+# Uses one Describe of the geodatabase, feature datasets are read from its children.
+# Subtypes are only listed, by a pool of threads, for datasets that have a subtype field.
+# Returns the schema signature and the (domain, field, subtype) uses of each dataset,
+# the signature is None when the subtypes could not be read
+def read_catalog(workspace):
+    catalog = {}
+    subtyped = []
+    pending = [(workspace, arcpy.Describe(workspace).children)]
+    while pending:
+        parent, children = pending.pop()
+        for child in children:
+            path = os.path.join(parent, child.name)
+            if child.dataType == "FeatureDataset":
+                pending.append((path, child.children))
+            elif child.dataType in ("FeatureClass", "Table"):
+                schema = [(field.name, field.type, field.domain) for field in child.fields]
+                schema.append(getattr(child, "subtypeFieldName", ""))
+                used = set((field.domain, field.name, u"") for field in child.fields if field.domain)
+                catalog[path] = [schema, used]
+                if getattr(child, "subtypeFieldName", ""):
+                    subtyped.append(path)
+    if subtyped:
+        pool = multiprocessing.pool.ThreadPool(min(thread_count, len(subtyped)))
+        for dataset, used, err in pool.imap_unordered(find_subtype_domains, subtyped):
+            if err is not None:
+                arcpy.AddMessage("Error reading subtypes of {}: {}".format(dataset, err))
+                catalog[dataset][0] = None
+                continue
+            # Subtype domains are part of the signature so assigning one marks the dataset as changed
+            catalog[dataset][0].extend(sorted(used))
+            catalog[dataset][1].update(used)
+    for dataset, (schema, used) in catalog.items():
+        if schema is not None:
+            catalog[dataset] = (hashlib.md5(repr(schema).encode("utf-8")).hexdigest(), used)
+        else:
+            catalog[dataset] = (None, used)
+    return catalog
+
+
+# Define function to bring the index up to date with the geodatabase
+# Usages are rewritten only for datasets that are new or whose signature changed
+def refresh_index(index, workspace):
+    catalog = read_catalog(workspace)
+    stored = dict(index.execute("SELECT dataset, signature FROM datasets"))
+    changed = [dataset for dataset in catalog if full_refresh or catalog[dataset][0] is None
+               or stored.get(dataset) != catalog[dataset][0]]
+    removed = [dataset for dataset in stored if dataset not in catalog]
+    arcpy.AddMessage("{} datasets, {} changed, {} removed since last run".format(len(catalog), len(changed), len(removed)))
+
+    for dataset in removed:
+        index.execute("DELETE FROM usages WHERE dataset = ?", (dataset,))
+        index.execute("DELETE FROM datasets WHERE dataset = ?", (dataset,))
+    for dataset in changed:
+        signature, used = catalog[dataset]
+        if signature is None:
+            # Usages and signature are left as they were so the dataset is checked again next run
+            continue
+        index.execute("DELETE FROM usages WHERE dataset = ?", (dataset,))
+        index.executemany("INSERT INTO usages (domain, dataset, field, subtype) VALUES (?, ?, ?, ?)",
+                          [(domain, dataset, field, subtype) for domain, field, subtype in used])
+        index.execute("INSERT OR REPLACE INTO datasets (dataset, signature) VALUES (?, ?)", (dataset, signature))
+        arcpy.AddMessage("Updated {}".format(dataset))
+    index.commit()
+
+
+# Define function to create a deleted domain again from the definition saved by ListDomains
+def restore_domain(workspace, dom):
+    coded = dom.domainType == "CodedValue"
+    arcpy.CreateDomain_management(workspace, dom.name, dom.description,
+                                  field_types.get(dom.type, dom.type.upper()), "CODED" if coded else "RANGE",
+                                  split_policies.get(dom.splitPolicy, "DEFAULT"),
+                                  merge_policies.get(dom.mergePolicy, "DEFAULT"))
+    if coded:
+        for code, description in dom.codedValues.items():
+            arcpy.AddCodedValueToDomain_management(workspace, dom.name, code, description)
+    else:
+        arcpy.SetValueForRangeDomain_management(workspace, dom.name, dom.range[0], dom.range[1])
+
+
+# Define function to delete a batch of domains
+# Stops at the first failure and creates the domains already deleted in this batch again,
+# so either every domain in the batch is deleted or none are
+def delete_domains(workspace, domains):
+    results = []
+    deleted = []
+    for dom in domains:
+        start = time.time()
         try:
-            ## Check for normal field domains
-            for field in arcpy.ListFields(os.path.join(dirpath, filename)):
-                if field.domain:
-                    domains_used.append(field.domain)
-            ## Check for domains used in a subtype field
-            subtypes = arcpy.da.ListSubtypes(os.path.join(dirpath, filename))
-            for stcode, stdict in subtypes.iteritems():
-                if stdict["SubtypeField"] != u'':
-                    for field, fieldvals in stdict["FieldValues"].iteritems():
-                        if not fieldvals[1] is None:
-                            domains_used.append(fieldvals[1].name)
-        except Exception, err:
-            arcpy.AddMessage("Error:")
-
-# Get domains that exist in the geodatabase
-domains_existing = [dom.name for dom in arcpy.da.ListDomains(myGDB)]
-
-# Find existing domains that are not assigned to a field
-domains_unused = set(domains_existing) ^ set(domains_used)
-arcpy.AddMessage(domains_unused)
-for domain in domains_unused:
-    arcpy.DeleteDomain_management(myGDB, domain)
-    arcpy.AddMessage("{} deleted".format(domain))
+            arcpy.DeleteDomain_management(workspace, dom.name)
+        except Exception as err:
+            results.append({"domain": dom.name, "status": "failed", "seconds": round(time.time() - start, 3), "error": str(err)})
+            arcpy.AddError("{} could not be deleted: {}".format(dom.name, err))
+            arcpy.AddError("Rolling back {} deleted domains".format(len(deleted)))
+            for restore in reversed(deleted):
+                try:
+                    restore_domain(workspace, restore)
+                    status = "restored"
+                except Exception as restore_err:
+                    status = "restore failed"
+                    arcpy.AddError("{} could not be restored: {}".format(restore.name, restore_err))
+                for result in results:
+                    if result["domain"] == restore.name:
+                        result["status"] = status
+            return results, False
+        deleted.append(dom)
+        results.append({"domain": dom.name, "status": "deleted", "seconds": round(time.time() - start, 3)})
+        arcpy.AddMessage("{} deleted".format(dom.name))
+    return results, True
+
+
+# Define function to write the deletion plan
+def write_plan(path, plan):
+    with open(path, "w") as plan_file:
+        json.dump(plan, plan_file, indent=2)
+
+
+index = open_index(index_path)
+
+if query_domain:
+    # List the fields that use a domain from the index
+    usages = index.execute("SELECT dataset, field, subtype FROM usages WHERE domain = ? ORDER BY dataset, field",
+                           (query_domain,)).fetchall()
+    arcpy.AddMessage("{} is used by {} fields".format(query_domain, len(usages)))
+    for dataset, field, subtype in usages:
+        if subtype:
+            arcpy.AddMessage("{} {} (subtype {})".format(dataset, field, subtype))
+        else:
+            arcpy.AddMessage("{} {}".format(dataset, field))
+
+else:
+    # Get domains that are assigned to a field
+    refresh_index(index, myGDB)
+    domains_used = set(row[0] for row in index.execute("SELECT DISTINCT domain FROM usages"))
+
+    # Get domains that exist in the geodatabase, definitions are kept for rollback
+    domains_existing = dict((dom.name, dom) for dom in arcpy.da.ListDomains(myGDB))
+
+    # Find existing domains that are not assigned to a field
+    domains_unused = sorted(set(domains_existing) - domains_used)
+    domains_missing = sorted(domains_used - set(domains_existing))
+    plan = {"geodatabase": myGDB,
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "dry_run": dry_run,
+            "counts": {"existing": len(domains_existing), "used": len(domains_used),
+                       "unused": len(domains_unused), "used_not_existing": len(domains_missing)},
+            "delete": domains_unused,
+            "used_not_existing": domains_missing}
+    arcpy.AddMessage("{} domains exist, {} are used, {} will be deleted".format(len(domains_existing), len(domains_used), len(domains_unused)))
+    for domain in domains_missing:
+        arcpy.AddWarning("{} is assigned to a field but does not exist in the geodatabase".format(domain))
+
+    # Write the plan before anything is deleted
+    write_plan(plan_path, plan)
+    arcpy.AddMessage("Plan written to {}".format(plan_path))
+
+    if not dry_run and domains_unused:
+        start = time.time()
+        plan["results"], plan["completed"] = delete_domains(myGDB, [domains_existing[name] for name in domains_unused])
+        plan["seconds"] = round(time.time() - start, 3)
+        # Write the plan again with the result and time of each domain
+        write_plan(plan_path, plan)
+        arcpy.AddMessage("Results written to {}".format(plan_path))
+
+index.close()
@@ -8,60 +8,452 @@
 # Author:       Skultety
 #
 # Created:      02/22/2018
-# Updated:      03/07/2018
+# Updated:      10/18/2026
 #
 # Upgrades:     v1.1 - Includes BMP project boundaries in export
+#               v1.2 - Feature class names are resolved with one listing per workspace
+#               and the layers are copied by a pool of worker processes, one for each
+#               workspace. Row count and time of each layer are reported.
+#               v1.3 - Optional incremental update of an existing snapshot. Rows are
+#               matched by GlobalID and only inserted, updated and deleted rows are
+#               written. Changes are found from the editor tracking date field when the
+#               layer has one, otherwise from a hash of each row. Full exports and
+#               missing snapshots are appended in one copy with their GlobalIDs kept.
+#               v1.4 - Optional JSON file of export jobs replaces the built in layers.
+#               Each job names a source workspace and feature class and can set the
+#               output name, a where clause and the fields to copy. Layers that fail
+#               are tried again on their own without repeating the layers that copied.
+#               Job files with two jobs writing the same output are rejected and the
+#               jobs of a workspace that cannot be read fail without stopping the others.
+#               v1.5 - Optional GeoParquet output. Each layer is streamed from the cursor
+#               to a compressed Parquet file in batches with the shape stored as WKB, so
+#               the analysis tables can be read by column instead of row by row.
+#               Requires the pyarrow module, the coordinate system is only written
+#               when the pyproj module is also installed.
+#               v1.6 - Feature class names are resolved from the shared Workspace_Catalog
+#               module, one Describe of each workspace.
+#               v1.7 - Worker processes copy their layers to their own scratch file
+#               geodatabase and only the main process writes to the output geodatabase,
+#               file geodatabases do not allow several processes to write at once.
+#               The workers still read the sources in parallel, but the main process
+#               writes each layer to the output one after another, so a full export
+#               again takes roughly the sum of the layer copy times.
 #-------------------------------------------------------------------------------------
 
 # Import modules
 import arcpy
+import hashlib
+import json
+import multiprocessing
 import os
+import shutil
 import sys
+import tempfile
+import time
 
-# Get tool inputs from ArcMap tool dialog
-workspace1 = arcpy.GetParameterAsText(0)
-workspace2 = arcpy.GetParameterAsText(1)
-workspace3 = arcpy.GetParameterAsText(2)
-outDirectory = arcpy.GetParameterAsText(3)
-gdbName = arcpy.GetParameterAsText(4)
-
-# Create new file geodatabase
-try:
-    gdbName = gdbName + ".gdb"
-    arcpy.CreateFileGDB_management(outDirectory, gdbName)
-    outGDB = os.path.join(outDirectory, gdbName)
-except:
-    arcpy.AddError("File geodatabase could not be created.")
-    sys.exit()
-
-# Copy features from IDOT Delineations
+# Shared modules are kept next to this script
+scriptFolder = os.path.dirname(os.path.abspath(__file__))
+if scriptFolder not in sys.path:
+    sys.path.insert(0, scriptFolder)
+from Workspace_Catalog import ReadCatalog, FindFeatureClass
 try:
-    arcpy.env.workspace = workspace1
-    outFeatureClass = os.path.join(outGDB, arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Project_Boundaries")[0])
-    arcpy.CopyFeatures_management(arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Project_Boundaries")[0], outFeatureClass)
-    outFeatureClass = os.path.join(outGDB, arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Wetland_Sites")[0])
-    arcpy.CopyFeatures_management(arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Wetland_Sites")[0], outFeatureClass)
-except:
-    arcpy.AddError("Features from IDOT Delineations could not be exported")
-    sys.exit()
-
-# Copy features from IDOT Delineations Pre GPS
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
 try:
-    arcpy.env.workspace = workspace2
-    outFeatureClass = os.path.join(outGDB, arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Project_Boundaries_Drawn")[0])
-    arcpy.CopyFeatures_management(arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Project_Boundaries_Drawn")[0], outFeatureClass)
-    outFeatureClass = os.path.join(outGDB, arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Wetland_Point")[0])
-    arcpy.CopyFeatures_management(arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.Wetland_Point")[0], outFeatureClass)
-except:
-    arcpy.AddError("Features from IDOT Delineations Pre GPS could not be exported")
-    sys.exit()
-
-# Copy features from IDOT BMPs
-try:
-    arcpy.env.workspace = workspace3
-    outFeatureClass = os.path.join(outGDB, arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.BMP_Project_Boundaries")[0])
-    arcpy.CopyFeatures_management(arcpy.ListFeatureClasses("IDOT_Wetlands.INHS_IDOT.BMP_Project_Boundaries")[0], outFeatureClass)
+    import pyproj
+except ImportError:
+    pyproj = None
+
+# Feature classes copied from each workspace parameter when no job file is given
+layersByWorkspace = [
+    # IDOT Delineations
+    ["IDOT_Wetlands.INHS_IDOT.Project_Boundaries", "IDOT_Wetlands.INHS_IDOT.Wetland_Sites"],
+    # IDOT Delineations Pre GPS
+    ["IDOT_Wetlands.INHS_IDOT.Project_Boundaries_Drawn", "IDOT_Wetlands.INHS_IDOT.Wetland_Point"],
+    # IDOT BMPs
+    ["IDOT_Wetlands.INHS_IDOT.BMP_Project_Boundaries"],
+]
+
+# Arrow column types for each field type, shapes are stored as WKB in a binary column
+# named geometry and blob and raster fields are left out
+arrowTypes = {
+    "OID": "int64", "SmallInteger": "int16", "Integer": "int32", "Single": "float32",
+    "Double": "float64", "String": "string", "Date": "timestamp", "GUID": "string", "GlobalID": "string",
+}
+
+# Rows written to a Parquet file at a time, each batch becomes one row group
+parquetBatchSize = 50000
+
+# Define function to read a version of each row keyed by GlobalID
+# Uses the editor tracking date when there is one, otherwise a hash of the attributes and shape
+def RowVersions(featureClass, globalIdField, editedField, hashFields, where=None):
+    versions = {}
+    if editedField:
+        with arcpy.da.SearchCursor(featureClass, [globalIdField, editedField], where) as cursor:
+            for row in cursor:
+                versions[row[0]] = row[1]
+    else:
+        with arcpy.da.SearchCursor(featureClass, [globalIdField] + hashFields, where) as cursor:
+            for row in cursor:
+                versions[row[0]] = hashlib.md5(repr(row[1:]).encode("utf-8")).hexdigest()
+    return versions
+
+# Define function to build where clauses selecting rows by GlobalID, in groups so the
+# IN list stays under the database limit
+def GlobalIdWheres(featureClass, globalIdField, globalIds):
+    fieldName = arcpy.AddFieldDelimiters(featureClass, globalIdField)
+    globalIds = sorted(globalIds)
+    for i in range(0, len(globalIds), 500):
+        yield "{0} IN ({1})".format(fieldName, ", ".join("'{0}'".format(globalId) for globalId in globalIds[i:i + 500]))
+
+# Define function to make a feature layer of a job's source with its where clause and
+# fields, an extra where clause can narrow it further
+def MakeJobLayer(job, layerName, extraWhere=None):
+    source = os.path.join(job["source"], job["name"])
+    wheres = ["({0})".format(where) for where in (job["where"], extraWhere) if where]
+    fieldInfo = None
+    if job["fields"]:
+        # Requested fields plus the fields every feature class needs, the editor tracking
+        # date is kept so incremental updates can find changed rows
+        desc = arcpy.Describe(source)
+        keep = set(field.lower() for field in job["fields"])
+        keep.update(name.lower() for name in (desc.OIDFieldName, desc.shapeFieldName, desc.globalIDFieldName) if name)
+        if getattr(desc, "editorTrackingEnabled", False) and desc.editedAtFieldName:
+            keep.add(desc.editedAtFieldName.lower())
+        fieldInfo = arcpy.FieldInfo()
+        for field in desc.fields:
+            fieldInfo.addField(field.name, field.name, "VISIBLE" if field.name.lower() in keep else "HIDDEN", "NONE")
+    if arcpy.Exists(layerName):
+        # Left by an attempt that failed before the layer was deleted
+        arcpy.Delete_management(layerName)
+    return arcpy.MakeFeatureLayer_management(source, layerName, " AND ".join(wheres), field_info=fieldInfo).getOutput(0)
+
+# Define function to copy a job's rows to a feature class keeping their GlobalIDs
+# CopyFeatures gives new GlobalIDs, so it only creates the empty schema and the rows are
+# appended with preserveGlobalIds, which CopyWorkspace sets. Without where clauses every
+# row is appended at once, otherwise one append for each where clause.
+def CopyJobRows(job, outFeatureClass, wheres=None):
+    layer = MakeJobLayer(job, "snapshot_schema", "1 = 0")
+    arcpy.CopyFeatures_management(layer, outFeatureClass)
+    arcpy.Delete_management(layer)
+    for where in wheres if wheres is not None else [None]:
+        layer = MakeJobLayer(job, "snapshot_rows", where)
+        arcpy.Append_management(layer, outFeatureClass, "NO_TEST")
+        arcpy.Delete_management(layer)
+
+# Define function to find the changes needed to bring a snapshot up to date
+# Runs in a worker process. Changed and new rows are copied from the source to a
+# feature class in the worker's scratch geodatabase, and the GlobalIDs of rows to
+# remove from the snapshot (deleted or changed) are returned in the result. A missing
+# snapshot gets every row of the source in one copy without comparing versions.
+def PrepareSnapshot(job, target, scratchFeatureClass, result):
+    source = os.path.join(job["source"], job["name"])
+    desc = arcpy.Describe(source)
+    globalIdField = desc.globalIDFieldName
+    if not globalIdField:
+        raise ValueError("layer has no GlobalID field to match rows")
+    result["globalIdField"] = globalIdField
+    targetExists = arcpy.Exists(target)
+    if not targetExists:
+        CopyJobRows(job, scratchFeatureClass)
+        result["remove"] = []
+        result["inserted"] = int(arcpy.GetCount_management(scratchFeatureClass).getOutput(0))
+        result["updated"] = 0
+        result["deleted"] = 0
+        return
+    editedField = ""
+    if getattr(desc, "editorTrackingEnabled", False):
+        editedField = desc.editedAtFieldName
+        # Snapshots made without the date field are compared by hash instead
+        if editedField.lower() not in [field.name.lower() for field in arcpy.ListFields(target)]:
+            editedField = ""
+    skipFields = set([desc.OIDFieldName, globalIdField, getattr(desc, "areaFieldName", ""), getattr(desc, "lengthFieldName", "")])
+    requested = set(field.lower() for field in job["fields"] or [])
+    hashFields = sorted(field.name for field in desc.fields if field.name not in skipFields and field.type != "Geometry"
+                        and (not requested or field.name.lower() in requested))
+    hashFields.append("SHAPE@WKB")
+
+    sourceVersions = RowVersions(source, globalIdField, editedField, hashFields, job["where"] or None)
+    targetVersions = RowVersions(target, globalIdField, editedField, hashFields)
+    inserted = [globalId for globalId in sourceVersions if globalId not in targetVersions]
+    updated = [globalId for globalId in sourceVersions if globalId in targetVersions and sourceVersions[globalId] != targetVersions[globalId]]
+    deleted = [globalId for globalId in targetVersions if globalId not in sourceVersions]
+
+    # Copy new and changed rows from the source to the scratch geodatabase
+    CopyJobRows(job, scratchFeatureClass, list(GlobalIdWheres(source, globalIdField, inserted + updated)))
+    result["remove"] = deleted + updated
+    result["inserted"] = len(inserted)
+    result["updated"] = len(updated)
+    result["deleted"] = len(deleted)
+
+# Define function to write a worker's scratch feature class to the output geodatabase
+# Runs in the main process so only one process writes to the output geodatabase. A
+# full copy replaces the feature class, an incremental update removes the deleted and
+# changed rows and appends the new and changed rows with their GlobalIDs.
+def ApplyResult(result, outGDB, incremental):
+    outFeatureClass = os.path.join(outGDB, result["layer"])
+    if incremental and arcpy.Exists(outFeatureClass):
+        for where in GlobalIdWheres(outFeatureClass, result["globalIdField"], result["remove"]):
+            with arcpy.da.UpdateCursor(outFeatureClass, [result["globalIdField"]], where) as cursor:
+                for row in cursor:
+                    cursor.deleteRow()
+        arcpy.Append_management(result["scratch"], outFeatureClass, "NO_TEST")
+    else:
+        if arcpy.Exists(outFeatureClass):
+            arcpy.Delete_management(outFeatureClass)
+        # Copy writes the scratch feature class as stored, GlobalIDs included
+        arcpy.Copy_management(result["scratch"], outFeatureClass)
+    result["rows"] = int(arcpy.GetCount_management(outFeatureClass).getOutput(0))
+
+# Define function to stream a job's rows to a GeoParquet file
+# Columns are the job's fields plus the OID and GlobalID, the shape is written as WKB.
+# Rows are read from the cursor and written in batches so memory use stays flat.
+# The coordinate system is written as PROJJSON converted by pyproj, without pyproj it
+# is left undefined and a warning is added to the result. Returns the row count.
+def WriteGeoParquet(job, outPath, result):
+    source = os.path.join(job["source"], job["name"])
+    desc = arcpy.Describe(source)
+    requested = set(field.lower() for field in job["fields"] or [])
+    requested.update(name.lower() for name in (desc.OIDFieldName, desc.globalIDFieldName) if name)
+    fields = [field for field in desc.fields if field.type in arrowTypes
+              and (not job["fields"] or field.name.lower() in requested)]
+    types = []
+    for field in fields:
+        if arrowTypes[field.type] == "timestamp":
+            types.append(pyarrow.timestamp("ms"))
+        else:
+            types.append(pyarrow.type_for_alias(arrowTypes[field.type]))
+    schema = pyarrow.schema([pyarrow.field(field.name, fieldType) for field, fieldType in zip(fields, types)] +
+                            [pyarrow.field("geometry", pyarrow.binary())])
+
+    # GeoParquet metadata, the coordinate system is written as PROJJSON or null
+    geometryColumn = {"encoding": "WKB", "geometry_types": [], "crs": None}
+    spatialReference = desc.spatialReference
+    if spatialReference is None or spatialReference.name == "Unknown":
+        result["warning"] = "coordinate system is unknown, written as undefined"
+    elif pyproj is None:
+        result["warning"] = "coordinate system written as undefined, the pyproj module is not installed"
+    else:
+        try:
+            # exportToString gives the WKT followed by the coordinate precision
+            wkt = spatialReference.exportToString().split(";")[0]
+            geometryColumn["crs"] = pyproj.CRS.from_wkt(wkt).to_json_dict()
+        except Exception as err:
+            result["warning"] = "coordinate system written as undefined, it could not be converted - {0}".format(err)
+    extent = desc.extent
+    if extent is not None and extent.XMin is not None:
+        geometryColumn["bbox"] = [extent.XMin, extent.YMin, extent.XMax, extent.YMax]
+    geoMetadata = {"version": "1.0.0", "primary_column": "geometry", "columns": {"geometry": geometryColumn}}
+    schema = schema.with_metadata({b"geo": json.dumps(geoMetadata).encode("utf-8")})
+
+    rows = 0
+    writer = pyarrow.parquet.ParquetWriter(outPath, schema, compression="snappy")
+    try:
+        columns = [[] for column in schema]
+        with arcpy.da.SearchCursor(source, [field.name for field in fields] + ["SHAPE@WKB"], job["where"] or None) as cursor:
+            for row in cursor:
+                for column, value in zip(columns, row):
+                    column.append(value)
+                if len(columns[0]) == parquetBatchSize:
+                    writer.write_table(pyarrow.Table.from_arrays(
+                        [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+                    rows += parquetBatchSize
+                    columns = [[] for column in schema]
+        if columns[0] or rows == 0:
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+            rows += len(columns[0])
+    finally:
+        writer.close()
+    return rows
+
+# Define function to run the export jobs of one workspace, runs in a worker process so
+# results are returned instead of added as tool messages
+# Feature classes are copied to a scratch file geodatabase of this worker, the main
+# process moves them to the output geodatabase with ApplyResult
+def CopyWorkspace(task):
+    jobs, outGDB, incremental, outputFormat = task
+    arcpy.env.preserveGlobalIds = True
+    results = []
+    scratchFolder = None
+    if outputFormat != "GeoParquet":
+        scratchFolder = tempfile.mkdtemp(prefix="Geodatabase_Export_")
+        scratchGDB = arcpy.CreateFileGDB_management(scratchFolder, "scratch.gdb").getOutput(0)
+    for number, job in enumerate(jobs):
+        startTime = time.time()
+        result = {"job": job, "layer": job["target"], "workspace": job["source"], "rows": 0, "seconds": 0.0,
+                  "error": None, "scratchFolder": scratchFolder}
+        try:
+            if outputFormat == "GeoParquet":
+                result["rows"] = WriteGeoParquet(job, os.path.join(outGDB, job["target"] + ".parquet"), result)
+            else:
+                result["scratch"] = os.path.join(scratchGDB, "job{0}".format(number))
+                if incremental:
+                    PrepareSnapshot(job, os.path.join(outGDB, job["target"]), result["scratch"], result)
+                else:
+                    CopyJobRows(job, result["scratch"])
+        except Exception as err:
+            result["error"] = str(err)
+        result["seconds"] = time.time() - startTime
+        results.append(result)
+    if scratchFolder:
+        # Release this process's locks so the main process can remove the scratch geodatabase
+        arcpy.ClearWorkspaceCache_management()
+    return results
+
+# Define function to read export jobs from a JSON file
+# {"attempts": 3, "jobs": [{"source": workspace, "name": feature class, "target": output name,
+#                           "where": where clause, "fields": [field names]}, ...]}
+# Only source and name are required, the output name defaults to the feature class name.
+# Output names must be unique, two jobs writing the same output would replace each other.
+def ReadJobs(jobFile):
+    with open(jobFile, "r") as config:
+        config = json.load(config)
+    jobs = []
+    targets = set()
+    for job in config["jobs"]:
+        target = (job.get("target") or job["name"]).lower()
+        if target in targets:
+            raise ValueError("more than one job writes {0}".format(job.get("target") or job["name"]))
+        targets.add(target)
+        jobs.append({"source": job["source"], "name": job["name"], "target": job.get("target", ""),
+                     "where": job.get("where", ""), "fields": job.get("fields") or None})
+    return jobs, int(config.get("attempts", 3))
+
+if __name__ == '__main__':
+    # Get tool inputs from ArcMap tool dialog
+    workspace1 = arcpy.GetParameterAsText(0)
+    workspace2 = arcpy.GetParameterAsText(1)
+    workspace3 = arcpy.GetParameterAsText(2)
+    outDirectory = arcpy.GetParameterAsText(3)
+    gdbName = arcpy.GetParameterAsText(4)
+    # Optional, update the snapshot in an existing file geodatabase instead of creating one
+    incremental = arcpy.GetParameterAsText(5).lower() == "true"
+    # Optional JSON file of export jobs, replaces the workspace inputs above
+    jobFile = arcpy.GetParameterAsText(6)
+    # Optional output format, FileGDB (default) or GeoParquet files in a folder named gdbName
+    outputFormat = arcpy.GetParameterAsText(7) or "FileGDB"
+
+    # Export jobs from the job file or the built in layers of each workspace
+    if jobFile:
+        try:
+            jobs, attempts = ReadJobs(jobFile)
+        except (IOError, ValueError, KeyError) as err:
+            arcpy.AddError("Export job file could not be read - {0}".format(err))
+            sys.exit()
+    else:
+        jobs = []
+        for workspace, layers in zip([workspace1, workspace2, workspace3], layersByWorkspace):
+            for layer in layers:
+                jobs.append({"source": workspace, "name": layer, "target": "", "where": "", "fields": None})
+        attempts = 3
+
+    if outputFormat == "GeoParquet":
+        if pyarrow is None:
+            arcpy.AddError("GeoParquet output requires the pyarrow module.")
+            sys.exit()
+        if incremental:
+            arcpy.AddWarning("GeoParquet files are written in full, incremental update is ignored.")
+            incremental = False
+        # Create output folder for the Parquet files
+        outGDB = os.path.join(outDirectory, gdbName)
+        if not os.path.isdir(outGDB):
+            os.makedirs(outGDB)
+    else:
+        # Create new file geodatabase
+        try:
+            gdbName = gdbName + ".gdb"
+            outGDB = os.path.join(outDirectory, gdbName)
+            if not (incremental and arcpy.Exists(outGDB)):
+                arcpy.CreateFileGDB_management(outDirectory, gdbName)
+        except:
+            arcpy.AddError("File geodatabase could not be created.")
+            sys.exit()
+
+    # Resolve feature class names with one Describe of each workspace, the jobs of a
+    # workspace that cannot be read fail without stopping the other workspaces
+    resolvedJobs = []
+    unreadable = {}
+    for job in jobs:
+        if job["source"] not in unreadable:
+            try:
+                catalog = ReadCatalog(job["source"])
+            except Exception as err:
+                unreadable[job["source"]] = str(err)
+        if job["source"] in unreadable:
+            arcpy.AddError("{0} could not be exported from {1} - {2}".format(job["target"] or job["name"], job["source"], unreadable[job["source"]]))
+            continue
+        name = FindFeatureClass(catalog, job["name"])
+        if name is not None:
+            job["name"] = name
+            job["target"] = job["target"] or job["name"]
+            resolvedJobs.append(job)
+        else:
+            arcpy.AddError("{0} was not found in {1}".format(job["name"], job["source"]))
+
+    # Copy features, one worker process for each workspace. Layers that fail are
+    # tried again on their own, layers that copied are not repeated.
+    totalStart = time.time()
+    workspaceCount = len(set(job["source"] for job in resolvedJobs))
+    if workspaceCount > 1:
+        # ArcMap runs script tools inside its own process, workers must be
+        # started with the python interpreter instead of ArcMap
+        if not os.path.basename(sys.executable).lower().startswith("python"):
+            multiprocessing.set_executable(os.path.join(sys.exec_prefix, "pythonw.exe"))
+        pool = multiprocessing.Pool(workspaceCount)
+    else:
+        pool = None
+
+    # GlobalIDs of the scratch feature classes are kept in the output
+    arcpy.env.preserveGlobalIds = True
+    pending = resolvedJobs
+    for attempt in range(1, attempts + 1):
+        tasks = []
+        for workspace in sorted(set(job["source"] for job in pending)):
+            tasks.append(([job for job in pending if job["source"] == workspace], outGDB, incremental, outputFormat))
+        if pool is not None:
+            workspaceResults = pool.imap_unordered(CopyWorkspace, tasks)
+        else:
+            workspaceResults = (CopyWorkspace(task) for task in tasks)
+
+        failed = []
+        for results in workspaceResults:
+            for result in results:
+                if result["error"] is None and outputFormat != "GeoParquet":
+                    # Write to the output geodatabase from this process only
+                    startTime = time.time()
+                    try:
+                        ApplyResult(result, outGDB, incremental)
+                    except Exception as err:
+                        result["error"] = str(err)
+                    result["seconds"] += time.time() - startTime
+                if result.get("warning"):
+                    arcpy.AddWarning("{0}: {1}".format(result["layer"], result["warning"]))
+                if result["error"] is None and incremental:
+                    arcpy.AddMessage("{0}: {1} inserted, {2} updated, {3} deleted, {4} rows in {5:.1f} seconds".format(
+                        result["layer"], result["inserted"], result["updated"], result["deleted"], result["rows"], result["seconds"]))
+                elif result["error"] is None:
+                    arcpy.AddMessage("{0}: {1} rows copied in {2:.1f} seconds".format(result["layer"], result["rows"], result["seconds"]))
+                elif attempt < attempts:
+                    arcpy.AddWarning("{0} could not be exported from {1}, trying again - {2}".format(result["layer"], result["workspace"], result["error"]))
+                    failed.append(result["job"])
+                else:
+                    arcpy.AddError("{0} could not be exported from {1} - {2}".format(result["layer"], result["workspace"], result["error"]))
+            # Remove the worker's scratch geodatabase once its layers are written
+            if results and results[0]["scratchFolder"]:
+                try:
+                    arcpy.ClearWorkspaceCache_management()
+                    arcpy.Delete_management(os.path.join(results[0]["scratchFolder"], "scratch.gdb"))
+                    shutil.rmtree(results[0]["scratchFolder"], ignore_errors=True)
+                except Exception as err:
+                    arcpy.AddWarning("Scratch geodatabase {0} could not be removed - {1}".format(results[0]["scratchFolder"], err))
+        pending = failed
+        if not pending:
+            break
 
-except:
-    arcpy.AddError("Features from IDOT BMPs could not be exported")
-    sys.exit()
+    if pool is not None:
+        pool.close()
+        pool.join()
+    arcpy.AddMessage("Export finished in {0:.1f} seconds".format(time.time() - totalStart))
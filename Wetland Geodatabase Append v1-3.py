@@ -17,313 +17,481 @@
 #               Version 1.3 (03/09/2018) Modified to also accept file geodatabase as
 #               an input file source. Disabled 'waters' as a viable name for other
 #               surface water feature classes
+#               Version 1.4 (10/18/2026) Required fields are checked with one read of
+#               each feature class into a NumPy array instead of a cursor for every
+#               field. Every feature missing a value is reported before the tool stops.
+#               Version 1.5 (10/18/2026) Checks and appends are driven by one table of
+#               rules giving the prefix, geometry type, required fields and target of
+#               each layer. The input workspace is described once and the fields of each
+#               feature class are kept from that description. Removed the retired
+#               'Water*' checks and appends.
+#               Version 1.6 (10/18/2026) The workspace description is read with the
+#               shared Workspace_Catalog module.
+#               Version 1.7 (10/18/2026) All targets are loaded in one edit session and
+#               saved or discarded together, a failure no longer leaves the geodatabase
+#               partly loaded. The input feature classes are read by a pool of threads
+#               in batches and written with insert cursors. Rows per second are reported
+#               for each target.
+#               Version 1.8 (10/18/2026) Features already in a target are matched by
+#               their required fields (PID, Seq_Num and Site or Point). Existing keys are
+#               read only for the PIDs being added, incoming features are then added,
+#               updated when changed or skipped when unchanged, so a project can be
+#               delivered again without duplicating its features. Incoming key values
+#               are converted to the types of the target fields before they are matched
+#               and features added by the delivery are matched too, so a key delivered
+#               twice is only added once.
+#               Version 1.9 (10/18/2026) Project boundaries and wetland sites are checked
+#               for overlaps with other projects' features already in the geodatabase.
+#               Only target features selected by the extent of the delivery are read, and
+#               they are kept in a grid so each new feature is only compared with the
+#               features near it. Overlaps are warnings unless the user chooses to stop.
 #-------------------------------------------------------------------------------------
 
 # Import system modules
 import arcpy
+import math
+import multiprocessing.pool
 import os
 import sys
+import time
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+# Shared modules are kept next to this script
+scriptFolder = os.path.dirname(os.path.abspath(__file__))
+if scriptFolder not in sys.path:
+    sys.path.insert(0, scriptFolder)
+from Workspace_Catalog import ReadCatalog, MatchFeatureClasses
 
 # Get tool inputs from Arc interface
 arcpy.env.workspace = arcpy.GetParameterAsText(0)
 outDirectory = arcpy.GetParameterAsText(1)
+# Optional number of threads reading the input feature classes, defaults to 4
+readerCount = arcpy.GetParameterAsText(2)
+if readerCount:
+    readerCount = max(1, int(readerCount))
+else:
+    readerCount = 4
+# Optional, stop when new features overlap features already in the geodatabase
+stopOnOverlap = arcpy.GetParameterAsText(3).lower() == "true"
+
+# Rows read from an input feature class before they are handed to the writer
+batchSize = 1000
+
+# Fields every feature class must have filled in
+baseFields = ["PID", "Seq_Num"]
+
+# Rules for each layer in a project delivery
+# Feature class name prefix, geometry type, required fields, target feature class,
+# message name and whether to check for overlaps with the target's features.
+# The required fields of a prefix apply to all of its feature classes.
+appendRules = [
+    ("Project", "POLYGON", [], "Project_Boundaries", "Project boundaries", True),
+    ("Wetland", "POLYGON", ["Site"], "Wetland_Sites", "Wetland Sites", True),
+    ("Wetland", "LINE", ["Site"], "Wetland_Sites_Line", "Wetland Sites lines", False),
+    ("Non", "POINT", ["Site"], "Non_Wetland_NWI_Sites", "Non Wetland Determination Sites", False),
+    ("Sampling", "POINT", ["Point"], "Sampling_Points", "Sampling Points", False),
+    ("Other", "POLYGON", ["Site"], "Waters_poly", "Other Surface Waters (polygon)", False),
+    ("Other", "LINE", ["Site"], "Waters_line", "Other Surface Waters (lines)", False),
+    ("Transect", "LINE", [], "Transects", "Transects", False),
+]
+
+# Describe shape types for the geometry types used in the rules
+shapeTypes = {"POLYGON": "Polygon", "LINE": "Polyline", "POINT": "Point"}
+
+# Compile the rules, required fields by prefix and rules by prefix and shape type
+prefixFields = {}
+compiledRules = []
+for prefix, geometryType, fields, target, label, checkOverlap in appendRules:
+    prefixFields.setdefault(prefix.lower(), [])
+    for fieldname in fields:
+        if fieldname not in prefixFields[prefix.lower()]:
+            prefixFields[prefix.lower()].append(fieldname)
+    compiledRules.append((prefix.lower(), shapeTypes[geometryType],
+                          os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT." + target), label, checkOverlap))
+
+# Describe the input workspace once, name, shape type, object ID field and fields of
+# each feature class are kept for the checks and appends below
+catalog = ReadCatalog(arcpy.env.workspace)
 
 ### Check data before adding
 # Check if project boundary is a polygon
-fcList = arcpy.ListFeatureClasses("Project*", "POLYGON")
-if fcList == []:
+if MatchFeatureClasses(catalog, "Project", "Polygon") == []:
     arcpy.AddError("Project boundary is not a polygon")
     sys.exit()
-else:
-    del fcList
 
 # Check if attribute tables are complete
-# Define function to check for feature class
-def FieldExist(featureclass, fieldname):
-    fieldList = arcpy.ListFields(featureclass, fieldname)
-    fieldCount = len(fieldList)
-    if (fieldCount == 1):
-        return True
-    else:
-        return False
-
-# Define function to check if field has values
-# Indexing procedure has slight difference for shapefiles vs. geodatabase
-# Get description of arcpy.env.workspace
-desc = arcpy.Describe(arcpy.env.workspace)
-# If workspace is folder of shapefiles use this method
-if desc.workspaceType == 'FileSystem':
-    def FieldComplete(featureclass, fieldname):
-        x = 0
-        with arcpy.da.SearchCursor(featureclass, ("FID", fieldname)) as cursor:
-            for row in cursor:
-                if (row[1] is None):
-                    x += 1
-                elif (row[1] == 0):
-                    x += 1
-                elif (row[1] == ""):
-                    x += 1
-        if x > 0:
-            return False
+# Define function to find the features missing a value in each field
+# All fields are read in one pass into a NumPy array, nulls are read as 0 or an
+# empty string so a feature is missing a value when its field equals the null value
+# Returns a dictionary of field name and list of object IDs missing a value and the array
+def MissingValues(featureclass, fieldnames):
+    fields = catalog[featureclass]["fields"]
+    oidField = catalog[featureclass]["oidField"]
+    nullValues = {}
+    for fieldname in fieldnames:
+        if fields[fieldname.lower()].type == "String":
+            nullValues[fieldname] = ""
         else:
-            return True
-
-# Else the geodatabase method will be used
-else:
-    def FieldComplete(featureclass, fieldname):
-        x = 0
-        with arcpy.da.SearchCursor(featureclass, ("OBJECTID", fieldname)) as cursor:
-            for row in cursor:
-                if (row[1] is None):
-                    x += 1
-                elif (row[1] == 0):
-                    x += 1
-                elif (row[1] == ""):
-                    x += 1
-        if x > 0:
-            return False
+            nullValues[fieldname] = 0
+    array = arcpy.da.FeatureClassToNumPyArray(featureclass, [oidField] + fieldnames, null_value=nullValues)
+    missing = {}
+    for fieldname in fieldnames:
+        mask = array[fieldname] == nullValues[fieldname]
+        missing[fieldname] = array[oidField][mask].tolist()
+    return missing, array
+
+# Required fields for each feature class, the base fields plus the fields of its prefix
+requiredFields = {}
+for myFeatureClass in catalog:
+    requiredFields[myFeatureClass] = list(baseFields)
+    for prefix in prefixFields:
+        if myFeatureClass.lower().startswith(prefix):
+            requiredFields[myFeatureClass] += prefixFields[prefix]
+
+# Check every feature class and report all problems before stopping
+# The PIDs of each feature class are kept to find the features already in the targets
+errorCount = 0
+incomingPids = {}
+for myFeatureClass in sorted(requiredFields):
+    fieldnames = []
+    for fieldname in requiredFields[myFeatureClass]:
+        if fieldname.lower() not in catalog[myFeatureClass]["fields"]:
+            arcpy.AddError("Field '" + fieldname + "' does not exist in " + myFeatureClass)
+            errorCount += 1
         else:
-            return True
-
-# Check all features for sequence number and PID
-fcList = arcpy.ListFeatureClasses()
-
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "PID")):
-        arcpy.AddError("Field 'PID' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "PID")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'PID' field.")
-        sys.exit()
-
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "Seq_Num")):
-        arcpy.AddError("Field 'Seq_Num' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "Seq_Num")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Seq_Num' field.")
-        sys.exit()
-del fcList
-
-# Check for 'Site', 'Point' and 'Transect'
-fcList = arcpy.ListFeatureClasses("Wetland*")
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "Site")):
-        arcpy.AddError("Field 'Site' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "Site")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Site' field.")
-        sys.exit()
-del fcList
-
-fcList = arcpy.ListFeatureClasses("Non*")
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "Site")):
-        arcpy.AddError("Field 'Site' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "Site")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Site' field.")
-        sys.exit()
-del fcList
-
-# fcList = arcpy.ListFeatureClasses("Water*")
-# for myFeatureClass in fcList:
-#     if (not FieldExist(myFeatureClass, "Site")):
-#         arcpy.AddError("Field 'Site' does not exist in " + myFeatureClass)
-#         sys.exit()
-# for myFeatureClass in fcList:
-#     if (not FieldComplete(myFeatureClass, "Site")):
-#         arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Site' field.")
-#         sys.exit()
-# del fcList
-
-fcList = arcpy.ListFeatureClasses("Other*")
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "Site")):
-        arcpy.AddError("Field 'Site' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "Site")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Site' field.")
-        sys.exit()
-del fcList
-
-fcList = arcpy.ListFeatureClasses("Sampling*")
-for myFeatureClass in fcList:
-    if (not FieldExist(myFeatureClass, "Point")):
-        arcpy.AddError("Field 'Point' does not exist in " + myFeatureClass)
-        sys.exit()
-for myFeatureClass in fcList:
-    if (not FieldComplete(myFeatureClass, "Point")):
-        arcpy.AddError("At least one feature in " + myFeatureClass + " is missing a value in the 'Point' field.")
-        sys.exit()
-del fcList
+            fieldnames.append(fieldname)
+    if fieldnames:
+        missing, array = MissingValues(myFeatureClass, fieldnames)
+        if "PID" in fieldnames:
+            incomingPids[myFeatureClass] = set(array["PID"].tolist())
+        for fieldname in fieldnames:
+            if missing[fieldname]:
+                arcpy.AddError("{0} features in {1} are missing a value in the '{2}' field, object IDs: {3}".format(
+                    len(missing[fieldname]), myFeatureClass, fieldname, ", ".join(str(oid) for oid in missing[fieldname])))
+                errorCount += 1
+if errorCount > 0:
+    sys.exit()
 
 
 ## Add features to geodatabase
-# Add project boundary to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Project_Boundaries")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Project*", "POLYGON")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, schema_type="NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Project boundary was added to the geodatabase")
-    # Delete variables
-    del(outLocation)
-
-except:
-    arcpy.AddWarning("Project Boundary was not added to geodatabase")
-
-# Add wetland sites to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Wetland_Sites")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Wetland*", "POLYGON")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Wetland Sites were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Wetland Sites were not added to geodatabase")
-
-# Add wetland sites lines to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Wetland_Sites_Line")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Wetland*", "LINE")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Wetland Sites lines were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Wetland Sites lines were not added to geodatabase")
-
-# Add non wetland determination sites to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Non_Wetland_NWI_Sites")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Non*", "POINT")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Non Wetland Determination Sites were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Non Wetland Determination Sites were not added to geodatabase")
-
-# Add sampling points to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Sampling_Points")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Sampling*", "POINT")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Sampling Points were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Sampling Points were not added to geodatabase")
-
-# Add waters sites (polygon) to geodatabase
-# try:
-#     # Set output feature class to append to
-#     outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Waters_poly")
-#     # Get list of project boundary feature classes
-#     fcList = arcpy.ListFeatureClasses("Water*", "POLYGON")
-#     # Process: Append the feature classes into the empty feature class
-#     arcpy.Append_management(fcList, outLocation, "NO_TEST")
-#     # Add message to user
-#     arcpy.AddMessage("Water Sites (polygon) were added to the geodatabase")
-#     # Delete variables
-#     del (outLocation)
-#
-# except:
-#     arcpy.AddWarning("Waters Sites (polygon) were not added to geodatabase")
-#
-# # Add waters sites (lines) to geodatabase
-# try:
-#     # Set output feature class to append to
-#     outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Waters_line")
-#     # Get list of project boundary feature classes
-#     fcList = arcpy.ListFeatureClasses("Water*", "LINE")
-#     # Process: Append the feature classes into the empty feature class
-#     arcpy.Append_management(fcList, outLocation, "NO_TEST")
-#     # Add message to user
-#     arcpy.AddMessage("Water Sites (lines) were added to the geodatabase")
-#     # Delete variables
-#     del (outLocation)
-#
-# except:
-#     arcpy.AddWarning("Waters Sites (lines) were not added to geodatabase")
+# Define function to match the fields of an input feature class to its target
+# Returns the input and target field names of every editable target field that is
+# also in the input, the shape is added as a geometry object
+def MatchFields(featureclass, targetFields):
+    sourceFields = catalog[featureclass]["fields"]
+    inputNames = []
+    targetNames = []
+    for field in targetFields:
+        if field.editable and field.type not in ("OID", "GlobalID", "Geometry", "Blob", "Raster") \
+                and field.name.lower() in sourceFields:
+            inputNames.append(sourceFields[field.name.lower()].name)
+            targetNames.append(field.name)
+    return inputNames + ["SHAPE@"], targetNames + ["SHAPE@"]
+
+# Define function to convert an incoming key value to the type of the target field
+# Shapefiles can store a PID as a number, 1234.0 has to match the text '1234' in the
+# target. Values that cannot be converted are returned unchanged.
+def KeyValue(value, fieldType):
+    if value is None:
+        return None
+    try:
+        if fieldType in ("String", "GUID"):
+            if isinstance(value, float) and value.is_integer():
+                return str(int(value))
+            if isinstance(value, (int, float)):
+                return str(value)
+        elif fieldType in ("SmallInteger", "Integer"):
+            return int(float(value))
+        elif fieldType in ("Single", "Double"):
+            return float(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+# Define function to read the features of a target that have one of the incoming PIDs
+# Returns a dictionary of key (the values of the key fields) and the object ID and
+# values of the feature by lower case field name
+def ReadKeyIndex(target, fieldnames, pids):
+    index = {}
+    pidField = arcpy.AddFieldDelimiters(target["path"], "PID")
+    if target["pidType"] == "String":
+        pids = ["'{0}'".format(str(pid).replace("'", "''")) for pid in sorted(pids)]
+    else:
+        pids = [str(pid) for pid in sorted(pids)]
+    for i in range(0, len(pids), 500):
+        where = "{0} IN ({1})".format(pidField, ", ".join(pids[i:i + 500]))
+        with arcpy.da.SearchCursor(target["path"], ["OID@"] + fieldnames, where) as cursor:
+            for row in cursor:
+                values = dict(zip([fieldname.lower() for fieldname in fieldnames], row[1:]))
+                index[tuple(values[fieldname.lower()] for fieldname in target["keyFields"])] = (row[0], values)
+    return index
+
+# Define function to check if an incoming row differs from the feature in the target
+# A field the feature was not read or added with counts as changed
+def RowChanged(fieldnames, row, values):
+    for fieldname, value in zip(fieldnames, row):
+        if fieldname.lower() not in values:
+            return True
+        existing = values[fieldname.lower()]
+        if fieldname == "SHAPE@":
+            if (value is None) != (existing is None) or (value is not None and not value.equals(existing)):
+                return True
+        elif value != existing:
+            return True
+    return False
+
+# Grid cells across the extent of the delivery used to index the target features
+gridSize = 64
+
+# Define function to list the grid cells covered by an extent, limited to the grid
+def GridCells(extent, grid):
+    xmin, ymin, cellSize, columns, rows = grid
+    for column in range(max(0, int(math.floor((extent.XMin - xmin) / cellSize))),
+                        min(columns, int(math.floor((extent.XMax - xmin) / cellSize)) + 1)):
+        for row in range(max(0, int(math.floor((extent.YMin - ymin) / cellSize))),
+                         min(rows, int(math.floor((extent.YMax - ymin) / cellSize)) + 1)):
+            yield column, row
+
+# Define function to find new features that overlap features already in a target
+# Target features are selected by the extent of the new features and indexed in a
+# grid by their extent, each new feature is only tested against the features in its
+# cells. Features of the PIDs being delivered are left out, they are replaced by the
+# new features. Returns the input, object ID and PID of the new feature and the object
+# ID and PID of the target feature for each overlap.
+def FindOverlaps(target, inputs, pids):
+    pidFields = ["PID"] if target["pidType"] else []
+    incoming = []
+    for featureclass in inputs:
+        with arcpy.da.SearchCursor(featureclass, ["OID@", "SHAPE@"] + pidFields,
+                                   spatial_reference=target["spatialReference"]) as cursor:
+            for row in cursor:
+                if row[1] is not None:
+                    incoming.append((featureclass, row[0], row[1], row[2] if pidFields else None))
+    if incoming == []:
+        return []
+
+    # Extent of the delivery and the grid over it
+    xmin = min(feature[2].extent.XMin for feature in incoming)
+    ymin = min(feature[2].extent.YMin for feature in incoming)
+    xmax = max(feature[2].extent.XMax for feature in incoming)
+    ymax = max(feature[2].extent.YMax for feature in incoming)
+    cellSize = max(xmax - xmin, ymax - ymin) / float(gridSize) or 1.0
+    grid = (xmin, ymin, cellSize, int((xmax - xmin) / cellSize) + 1, int((ymax - ymin) / cellSize) + 1)
+    envelope = arcpy.Polygon(arcpy.Array([arcpy.Point(xmin, ymin), arcpy.Point(xmin, ymax),
+                                          arcpy.Point(xmax, ymax), arcpy.Point(xmax, ymin)]),
+                             target["spatialReference"])
+
+    # Index the target features selected by the extent of the delivery
+    layer = arcpy.MakeFeatureLayer_management(target["path"], "overlap_candidates").getOutput(0)
+    arcpy.SelectLayerByLocation_management(layer, "INTERSECT", envelope)
+    candidates = []
+    cells = {}
+    with arcpy.da.SearchCursor(layer, ["OID@", "SHAPE@"] + pidFields) as cursor:
+        for row in cursor:
+            if row[1] is None or (pidFields and row[2] in pids):
+                continue
+            for cell in GridCells(row[1].extent, grid):
+                cells.setdefault(cell, []).append(len(candidates))
+            candidates.append(row)
+    arcpy.Delete_management(layer)
+
+    # Test each new feature against the target features in its cells
+    overlaps = []
+    for featureclass, oid, geometry, pid in incoming:
+        tested = set()
+        extent = geometry.extent
+        for cell in GridCells(extent, grid):
+            for candidate in cells.get(cell, []):
+                if candidate in tested:
+                    continue
+                tested.add(candidate)
+                other = candidates[candidate]
+                otherExtent = other[1].extent
+                if otherExtent.XMin > extent.XMax or otherExtent.XMax < extent.XMin \
+                        or otherExtent.YMin > extent.YMax or otherExtent.YMax < extent.YMin:
+                    continue
+                # Features that only share an edge do not overlap
+                if not geometry.disjoint(other[1]) and not geometry.touches(other[1]):
+                    overlaps.append((featureclass, oid, pid, other[0], other[2] if pidFields else None))
+    return overlaps
+
+# Define function run by the reader threads, reads one input feature class in the
+# target's coordinate system and passes the rows to the writer in batches
+# The last item for each feature class has no rows and carries any error
+def ReadRows(taskIndex):
+    task = readTasks[taskIndex]
+    try:
+        rows = []
+        with arcpy.da.SearchCursor(task["input"], task["inputFields"], spatial_reference=task["spatialReference"]) as cursor:
+            for row in cursor:
+                rows.append(row)
+                if len(rows) == batchSize:
+                    rowQueue.put((taskIndex, rows, None))
+                    rows = []
+        if rows:
+            rowQueue.put((taskIndex, rows, None))
+        rowQueue.put((taskIndex, None, None))
+    except Exception as err:
+        rowQueue.put((taskIndex, None, "{0}: {1}".format(task["input"], err)))
+
+# Targets with input feature classes, their fields and the read tasks for each input
+targets = []
+readTasks = []
+for prefix, shapeType, outLocation, label, checkOverlap in compiledRules:
+    fcList = MatchFeatureClasses(catalog, prefix, shapeType)
+    if fcList == []:
+        arcpy.AddMessage("No " + label + " to add")
+        continue
+    targetDesc = arcpy.Describe(outLocation)
+    targetTypes = dict((field.name.lower(), field.type) for field in targetDesc.fields)
+    target = {"label": label, "path": outLocation, "inputs": len(fcList), "rows": 0, "seconds": 0.0,
+              "versioned": getattr(targetDesc, "isVersioned", False), "oidField": targetDesc.OIDFieldName,
+              "keyFields": baseFields + prefixFields[prefix], "pidType": targetTypes.get("pid"),
+              "keyTypes": [targetTypes.get(fieldname.lower()) for fieldname in baseFields + prefixFields[prefix]],
+              "spatialReference": targetDesc.spatialReference, "checkOverlap": checkOverlap, "inputList": fcList,
+              "index": None, "inserted": 0, "updated": 0, "skipped": 0, "updates": {}}
+    fieldnames = []
+    pids = set()
+    for myFeatureClass in fcList:
+        inputNames, targetNames = MatchFields(myFeatureClass, targetDesc.fields)
+        readTasks.append({"target": len(targets), "input": myFeatureClass, "inputFields": inputNames,
+                          "targetFields": targetNames, "spatialReference": targetDesc.spatialReference})
+        fieldnames += [fieldname for fieldname in targetNames if fieldname not in fieldnames]
+        pids.update(KeyValue(pid, target["pidType"]) for pid in incomingPids.get(myFeatureClass, []))
+    # Read the keys of the features already in the target for the incoming PIDs
+    if all(fieldname.lower() in [name.lower() for name in fieldnames] for fieldname in target["keyFields"]):
+        fieldnames.remove("SHAPE@")
+        fieldnames.append("SHAPE@")
+        target["index"] = ReadKeyIndex(target, fieldnames, pids)
+    else:
+        arcpy.AddWarning("{0} has no {1} fields to match existing features, all features will be added".format(
+            label, ", ".join(target["keyFields"])))
+    target["pids"] = pids
+    targets.append(target)
+
+### Check for overlaps with features already in the geodatabase
+overlapCount = 0
+for target in targets:
+    if not target["checkOverlap"]:
+        continue
+    for featureclass, oid, pid, targetOid, targetPid in FindOverlaps(target, target["inputList"], target["pids"]):
+        message = "{0} feature {1} (PID {2}) overlaps {3} feature {4} (PID {5})".format(
+            featureclass, oid, pid, target["label"], targetOid, targetPid)
+        if stopOnOverlap:
+            arcpy.AddError(message)
+        else:
+            arcpy.AddWarning(message)
+        overlapCount += 1
+if overlapCount > 0 and stopOnOverlap:
+    arcpy.AddError("No features were added to the geodatabase")
+    sys.exit()
 
-# Add other surface waters(polygon) to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Waters_poly")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Other*", "POLYGON")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Other Surface Waters (polygon) were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Other Surface Waterss (polygon) were not added to geodatabase")
-
-# Add other surface waters (lines) to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Waters_line")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Other*", "LINE")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Other Surface Waters (lines) were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Other Surface Waters (lines) were not added to geodatabase")
-
-# Add transects to geodatabase
-try:
-    # Set output feature class to append to
-    outLocation = os.path.join(outDirectory, "IDOT_Wetlands.INHS_IDOT.Transects")
-    # Get list of project boundary feature classes
-    fcList = arcpy.ListFeatureClasses("Transect*", "LINE")
-    # Process: Append the feature classes into the empty feature class
-    arcpy.Append_management(fcList, outLocation, "NO_TEST")
-    # Add message to user
-    arcpy.AddMessage("Transects were added to the geodatabase")
-    # Delete variables
-    del (outLocation)
-
-except:
-    arcpy.AddWarning("Transects were not added to geodatabase")
+# Batches of rows waiting to be written, bounded so readers wait for the writer
+rowQueue = queue.Queue(maxsize=readerCount * 4)
+
+# Start one edit session for every target, saved only if every target loads
+editor = arcpy.da.Editor(outDirectory)
+editor.startEditing(False, any(target["versioned"] for target in targets))
+editor.startOperation()
+startTime = time.time()
+pool = multiprocessing.pool.ThreadPool(readerCount)
+pool.map_async(ReadRows, range(len(readTasks)))
+# Insert cursors by target and field list, inputs can have different fields
+cursors = {}
+errors = []
+remaining = len(readTasks)
+while remaining > 0:
+    taskIndex, rows, error = rowQueue.get()
+    task = readTasks[taskIndex]
+    target = targets[task["target"]]
+    if rows is None:
+        remaining -= 1
+        target["inputs"] -= 1
+        if error is not None:
+            errors.append(error)
+        if target["inputs"] == 0:
+            target["seconds"] = time.time() - startTime
+        continue
+    if errors:
+        # Keep taking batches so the readers finish, nothing more is written
+        continue
+    try:
+        fieldKey = tuple(task["targetFields"])
+        cursorKey = (task["target"], fieldKey)
+        lowerKey = [name.lower() for name in fieldKey]
+        if target["index"] is not None:
+            keyPositions = [lowerKey.index(fieldname.lower()) for fieldname in target["keyFields"]]
+        for row in rows:
+            existing = None
+            if target["index"] is not None:
+                row = list(row)
+                for position, keyType in zip(keyPositions, target["keyTypes"]):
+                    row[position] = KeyValue(row[position], keyType)
+                key = tuple(row[position] for position in keyPositions)
+                existing = target["index"].get(key)
+            if existing is None:
+                if cursorKey not in cursors:
+                    cursors[cursorKey] = arcpy.da.InsertCursor(target["path"], task["targetFields"])
+                oid = cursors[cursorKey].insertRow(row)
+                target["inserted"] += 1
+                if target["index"] is not None:
+                    # Later features with the same key update this one instead of being added
+                    target["index"][key] = (oid, dict(zip(lowerKey, row)))
+            elif RowChanged(fieldKey, row, existing[1]):
+                # Written after the inserts with an update cursor on the object IDs
+                target["updates"].setdefault(fieldKey, {})[existing[0]] = row
+                target["updated"] += 1
+                values = dict(existing[1])
+                values.update(zip(lowerKey, row))
+                target["index"][key] = (existing[0], values)
+            else:
+                target["skipped"] += 1
+        target["rows"] += len(rows)
+    except Exception as err:
+        errors.append("{0}: {1}".format(task["input"], err))
+pool.close()
+pool.join()
+# Release the insert cursors before the edit session is closed
+cursors.clear()
+
+# Update the features that changed
+for target in targets:
+    if errors:
+        break
+    try:
+        updateStart = time.time()
+        oidField = arcpy.AddFieldDelimiters(target["path"], target["oidField"])
+        for fieldKey, updates in target["updates"].items():
+            oids = sorted(updates)
+            for i in range(0, len(oids), 500):
+                where = "{0} IN ({1})".format(oidField, ", ".join(str(oid) for oid in oids[i:i + 500]))
+                with arcpy.da.UpdateCursor(target["path"], ["OID@"] + list(fieldKey), where) as cursor:
+                    for row in cursor:
+                        cursor.updateRow([row[0]] + list(updates[row[0]]))
+        target["seconds"] += time.time() - updateStart
+    except Exception as err:
+        errors.append("{0}: {1}".format(target["label"], err))
+
+if errors:
+    # Discard the edits to every target
+    editor.abortOperation()
+    editor.stopEditing(False)
+    for error in errors:
+        arcpy.AddError("Features could not be added - " + error)
+    arcpy.AddError("No features were added to the geodatabase")
+    sys.exit()
+editor.stopOperation()
+editor.stopEditing(True)
+
+for target in targets:
+    seconds = max(target["seconds"], 0.001)
+    arcpy.AddMessage("{0} were added to the geodatabase: {1} added, {2} updated, {3} unchanged, "
+                     "{4} rows in {5:.1f} seconds ({6:.0f} rows/s)".format(
+                         target["label"], target["inserted"], target["updated"], target["skipped"],
+                         target["rows"], seconds, target["rows"] / seconds))
 
 # Refresh map view
 arcpy.RefreshActiveView()
@@ -0,0 +1,51 @@
+#-------------------------------------------------------------------------------------
+# Name:         Workspace Catalog
+# Type:         Python module used by the ArcGIS Script Tools
+# Purpose:      Reads the feature classes of a workspace with one Describe so the
+#               tools can select feature classes by name, prefix and shape type and
+#               check their fields without listing the workspace again.
+#
+# Author:       Skultety
+#
+# Created:      10/18/2026
+#-------------------------------------------------------------------------------------
+
+# Import modules
+import arcpy
+import os
+
+# Catalogs already read in this session by workspace path
+catalogs = {}
+
+# Define function to read the feature classes at the root of a workspace
+# Returns a dictionary of feature class name and its shape type, object ID field,
+# GlobalID field and fields keyed by lower case field name. A workspace is only
+# described once unless refresh is set.
+def ReadCatalog(workspace, refresh=False):
+    key = os.path.normcase(os.path.abspath(workspace))
+    if key in catalogs and not refresh:
+        return catalogs[key]
+    catalog = {}
+    for child in arcpy.Describe(workspace).children:
+        if child.dataType in ("FeatureClass", "ShapeFile"):
+            catalog[child.name] = {"shapeType": child.shapeType,
+                                   "oidField": child.OIDFieldName,
+                                   "globalIdField": getattr(child, "globalIDFieldName", ""),
+                                   "fields": dict((field.name.lower(), field) for field in child.fields)}
+    catalogs[key] = catalog
+    return catalog
+
+# Define function to list the feature classes starting with a prefix, optionally of
+# one shape type (Polygon, Polyline, Point), the prefix is not case sensitive
+def MatchFeatureClasses(catalog, prefix, shapeType=None):
+    prefix = prefix.lower()
+    return sorted(name for name in catalog if name.lower().startswith(prefix)
+                  and (shapeType is None or catalog[name]["shapeType"] == shapeType))
+
+# Define function to find the name of a feature class as it is stored in the
+# workspace, returns None if there is no feature class of that name
+def FindFeatureClass(catalog, name):
+    for catalogName in catalog:
+        if catalogName.lower() == name.lower():
+            return catalogName
+    return None